@@ -1,5 +1,10 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from main import VoiceCookingAssistant, RecipeManager
+from recipe_query import RecipeQuery
+from indian_recipes import autocomplete, recipe_etag
+from warmup import CacheWarmer, popular_queries
+from openai_async import REQUEST_DEADLINE_SECONDS, STREAM_DEADLINE_SECONDS, Deadline
+from streaming import sse_event
 import os
 from dotenv import load_dotenv
 import json
@@ -7,9 +12,16 @@ import json
 app = Flask(__name__)
 load_dotenv()
 
+# Catalog recipes only change on deploy; generated ones may be refreshed sooner
+LOCAL_RECIPE_MAX_AGE = int(os.getenv('LOCAL_RECIPE_MAX_AGE', 3600))
+API_RECIPE_MAX_AGE = int(os.getenv('API_RECIPE_MAX_AGE', 300))
+
 # Initialize the cooking assistant
 recipe_manager = RecipeManager()
 
+# Pre-fill caches with popular queries in the background; /api/ready reports when done
+cache_warmer = CacheWarmer(recipe_manager, popular_queries(query_log=recipe_manager.query_log)).start()
+
 @app.route('/')
 def home():
     return render_template('index.html')
@@ -24,8 +36,8 @@ def search_recipe():
         # Update recipe manager with ingredients
         recipe_manager.context['available_ingredients'] = ingredients
         
-        # Search for recipe
-        recipe, source = recipe_manager.process_user_query(query)
+        # Search for recipe; OpenAI work is bounded by the request's deadline
+        recipe, source = recipe_manager.process_user_query(query, Deadline(REQUEST_DEADLINE_SECONDS))
         
         if recipe:
             return jsonify({
@@ -34,11 +46,11 @@ def search_recipe():
                 'source': source
             })
         else:
-            # Get suggestions if exact match not found
-            suggestions = recipe_manager.get_recipe_suggestions(ingredients=ingredients)
+            # Get local suggestions if no match was found in time
+            result = recipe_manager.search(RecipeQuery(ingredients=ingredients, limit=5))
             return jsonify({
                 'success': True,
-                'suggestions': suggestions[:5]  # Return top 5 suggestions
+                'suggestions': result['suggestions']  # Return top 5 suggestions
             })
             
     except Exception as e:
@@ -47,21 +59,121 @@ def search_recipe():
             'error': str(e)
         }), 500
 
+@app.route('/api/stream_recipe')
+def stream_recipe():
+    # Same search as /api/search_recipe, but a recipe the model has to write is
+    # pushed over Server-Sent Events piece by piece: name, ingredients, steps
+    query = request.args.get('query', '')
+    ingredients = [ingredient for ingredient in request.args.get('ingredients', '').split(',') if ingredient]
+    recipe_manager.context['available_ingredients'] = ingredients
+    
+    def events():
+        try:
+            for event, data in recipe_manager.stream_user_query(query, Deadline(STREAM_DEADLINE_SECONDS)):
+                if event == 'not_found':
+                    result = recipe_manager.search(RecipeQuery(ingredients=ingredients, limit=5))
+                    yield sse_event('suggestions', result['suggestions'])
+                else:
+                    yield sse_event(event, data)
+        except Exception as e:
+            yield sse_event('error', {'error': str(e)})
+        # Tells the client to close rather than let EventSource reconnect
+        yield sse_event('done', {})
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/suggest_recipes', methods=['POST'])
 def suggest_recipes():
     try:
         data = request.json
-        ingredients = data.get('ingredients', [])
-        cuisine = data.get('cuisine', None)
+        query = RecipeQuery.from_dict(data)
+        
+        result = recipe_manager.search(query, explain=bool(data.get('explain')))
+        
+        response = {
+            'success': True,
+            'suggestions': result['suggestions'],
+            'next_cursor': result['next_cursor']
+        }
+        if 'plan' in result:
+            response['plan'] = result['plan']
+        return jsonify(response)
+    except ValueError as e:
+        # Malformed limit, numeric filter or cursor
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/pantry_recipes', methods=['POST'])
+def pantry_recipes():
+    try:
+        data = request.json or {}
+        ingredients = data.get('ingredients')
+        max_missing = int(data.get('max_missing') or 0)
         
-        suggestions = recipe_manager.get_recipe_suggestions(
-            ingredients=ingredients,
-            cuisine=cuisine
-        )
+        recipes = recipe_manager.find_pantry_recipes(ingredients, max_missing)
+        return jsonify({
+            'success': True,
+            'recipes': recipes
+        })
+    except ValueError as e:
+        # Non-numeric max_missing
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/autocomplete')
+def autocomplete_names():
+    try:
+        prefix = request.args.get('q', '')
+        limit = min(int(request.args.get('limit', 8)), 20)
+        kinds = [kind for kind in request.args.get('types', '').split(',') if kind]
         
         return jsonify({
             'success': True,
-            'suggestions': suggestions[:5]
+            'suggestions': autocomplete(prefix, limit, kinds)
+        })
+    except ValueError as e:
+        # Non-numeric limit
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/ready')
+def ready():
+    status = cache_warmer.status()
+    return jsonify({
+        'success': True,
+        'warmup': status
+    }), 200 if status['ready'] else 503
+
+@app.route('/api/cache_stats')
+def cache_stats():
+    try:
+        return jsonify({
+            'success': True,
+            'caches': recipe_manager.cache_stats(),
+            'single_flight': recipe_manager.single_flight_stats(),
+            'hedged_fetch': recipe_manager.recipe_fetcher.stats()
         })
     except Exception as e:
         return jsonify({
@@ -74,11 +186,20 @@ def recipe_details(recipe_name):
     try:
         recipe, is_local = recipe_manager.get_recipe_details(recipe_name)
         if recipe:
-            return jsonify({
-                'success': True,
-                'recipe': recipe,
-                'is_local': is_local
-            })
+            # The body is fully determined by the recipe content and its source
+            etag = recipe_etag(recipe) + ('-local' if is_local else '-api')
+            if request.if_none_match.contains_weak(etag):
+                response = app.response_class(status=304)
+            else:
+                response = jsonify({
+                    'success': True,
+                    'recipe': recipe,
+                    'is_local': is_local
+                })
+            response.set_etag(etag)
+            response.cache_control.public = True
+            response.cache_control.max_age = LOCAL_RECIPE_MAX_AGE if is_local else API_RECIPE_MAX_AGE
+            return response
         else:
             return jsonify({
                 'success': False,
@@ -0,0 +1,423 @@
+"""
+Micro-benchmarks for the recipe search paths.
+
+Usage:
+    python benchmark.py [autocomplete|extractor_cache|fuzzy_match|hedged_fetch|name_lookup|openai_path|pantry|shared_cache|text_search]
+"""
+
+import argparse
+import heapq
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+from cache_store import PersistentCache
+from search_index import BM25Index, FuzzyMatcher, PantryIndex, PrefixIndex, TrigramIndex, tokenize
+
+WORDS = [
+    "butter", "chicken", "paneer", "masala", "dal", "aloo", "gobi", "fish", "curry", "tikka",
+    "tandoori", "kerala", "bengali", "goan", "malabar", "chettinad", "kolhapuri", "saag", "palak",
+    "dosa", "idli", "vada", "pav", "biryani", "pulao", "korma", "vindaloo", "rogan", "josh",
+    "kadai", "makhani", "jalfrezi", "dum", "bhuna", "keema", "kofta", "chole", "rajma", "bhindi",
+]
+
+
+def synthetic_names(count: int, seed: int = 7):
+    """Generate `count` distinct dish names built from common recipe words"""
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        names.add(' '.join(rng.sample(WORDS, rng.randint(2, 4))) + f" {rng.randint(1, 999)}")
+    return sorted(names)
+
+
+def _time_per_query(lookup, queries, repeat: int = 3) -> float:
+    """Best-of-`repeat` average time per query, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            lookup(query)
+        best = min(best, (time.perf_counter() - start) / len(queries))
+    return best * 1000
+
+
+def bench_name_lookup(sizes=(1000, 5000, 20000, 50000), query_count: int = 50):
+    """Compare a linear SequenceMatcher scan with trigram candidate lookup"""
+    rng = random.Random(11)
+    print(f"{'recipes':>8} {'linear ms':>10} {'trigram ms':>11} {'speedup':>8}")
+    for size in sizes:
+        names = synthetic_names(size)
+        index = TrigramIndex()
+        for position, name in enumerate(names):
+            index.add(name, position)
+
+        # Misspell real names the way a voice transcript would
+        queries = [name.replace('a', 'e', 1) for name in rng.sample(names, query_count)]
+
+        def linear(query):
+            best, best_ratio = None, 0.6
+            for name in names:
+                ratio = SequenceMatcher(None, query, name).ratio()
+                if ratio > best_ratio:
+                    best, best_ratio = name, ratio
+            return best
+
+        def indexed(query):
+            best, best_ratio = None, 0.6
+            for key, _ in index.candidates(query):
+                ratio = SequenceMatcher(None, query, key).ratio()
+                if ratio > best_ratio:
+                    best, best_ratio = key, ratio
+            return best
+
+        # The linear scan is slow enough that a handful of queries gives a stable figure
+        linear_ms = _time_per_query(linear, queries[:10], repeat=1)
+        indexed_ms = _time_per_query(indexed, queries)
+        print(f"{size:>8} {linear_ms:>10.2f} {indexed_ms:>11.3f} {linear_ms / indexed_ms:>7.0f}x")
+
+
+def bench_fuzzy_match(sizes=(1000, 5000, 20000), query_count: int = 20):
+    """Compare pairwise SequenceMatcher filtering with the BK-tree fuzzy matcher"""
+    rng = random.Random(13)
+    print(f"{'keys':>8} {'pairwise ms':>12} {'bk-tree ms':>11} {'speedup':>8}")
+    for size in sizes:
+        keys = synthetic_names(size)
+        matcher = FuzzyMatcher(keys)
+        queries = [key.replace('a', 'e', 1) for key in rng.sample(keys, query_count)]
+
+        def pairwise(query):
+            return [key for key in keys if SequenceMatcher(None, query, key).ratio() > 0.8]
+
+        pairwise_ms = _time_per_query(pairwise, queries, repeat=1)
+        matcher_ms = _time_per_query(lambda query: matcher.within(query, 0.8), queries)
+        print(f"{size:>8} {pairwise_ms:>12.2f} {matcher_ms:>11.3f} {pairwise_ms / matcher_ms:>7.1f}x")
+
+
+def bench_text_search(sizes=(1000, 5000, 20000), query_count: int = 200):
+    """Compare BM25 scoring by scanning every document with the inverted index"""
+    rng = random.Random(17)
+    print(f"{'docs':>8} {'linear ms':>10} {'bm25 ms':>9} {'speedup':>8}")
+    for size in sizes:
+        # Zipf-like vocabulary so common words are dense and most terms are rare, as in real text
+        vocabulary = [f"{word}{suffix}" for suffix in ('', 'a', 'e', 'i', 'o', 'u', 'y') for word in WORDS]
+        vocabulary += [f"term{number}" for number in range(size // 2)]
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        docs = [' '.join(rng.choices(vocabulary, weights, k=rng.randint(20, 60))) for _ in range(size)]
+        index = BM25Index()
+        for doc_id, text in enumerate(docs):
+            index.add(doc_id, text)
+        doc_counts = [Counter(tokenize(text)) for text in docs]
+        queries = [' '.join(rng.sample(rng.choice(docs).split(), 3)) for _ in range(query_count)]
+
+        def linear(query):
+            terms = [term for term in set(tokenize(query)) if term in index.postings]
+            norms = index._norms
+            scores = []
+            for doc_id, counts in enumerate(doc_counts):
+                score = 0.0
+                for term in terms:
+                    frequency = counts.get(term, 0)
+                    if frequency:
+                        score += index._term_idf(term) * frequency * (index.k1 + 1) / (frequency + norms[doc_id])
+                if score:
+                    scores.append((doc_id, score))
+            return heapq.nlargest(5, scores, key=lambda item: item[1])
+
+        index.search(queries[0])  # builds the length norms shared by both paths
+        linear_ms = _time_per_query(linear, queries[:20], repeat=1)
+        index_ms = _time_per_query(lambda query: index.search(query, 5), queries)
+        print(f"{size:>8} {linear_ms:>10.2f} {index_ms:>9.3f} {linear_ms / index_ms:>7.1f}x")
+
+
+def bench_autocomplete(sizes=(1000, 20000, 100000), query_count: int = 500):
+    """Time typeahead completion for short and long prefixes as the name list grows"""
+    rng = random.Random(19)
+    print(f"{'names':>8} {'1-char ms':>10} {'3-char ms':>10} {'6-char ms':>10}")
+    for size in sizes:
+        names = synthetic_names(size)
+        index = PrefixIndex()
+        for name in names:
+            index.add(name, "recipe")
+        index.complete("warm up")
+        samples = rng.sample(names, query_count)
+        timings = [_time_per_query(lambda query: index.complete(query, 8), [name[:length] for name in samples])
+                   for length in (1, 3, 6)]
+        print(f"{size:>8} " + ' '.join(f"{ms:>10.3f}" for ms in timings))
+
+
+def bench_pantry(sizes=(1000, 10000, 50000), query_count: int = 50):
+    """Compare a set-subset scan over every recipe with the pantry index"""
+    rng = random.Random(23)
+    vocabulary = [f"ingredient {number}" for number in range(2000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    print(f"{'recipes':>8} {'set scan ms':>12} {'index ms':>11} {'speedup':>8}")
+    for size in sizes:
+        recipes = {f"recipe {number}": set(rng.choices(vocabulary, weights, k=rng.randint(4, 14)))
+                   for number in range(size)}
+        ingredient_index = defaultdict(set)
+        for recipe_id, ingredients in recipes.items():
+            for name in ingredients:
+                ingredient_index[name].add(recipe_id)
+        index = PantryIndex(list(recipes), ingredient_index)
+        pantries = [set(rng.choices(vocabulary, weights, k=25)) for _ in range(query_count)]
+
+        def scan(pantry):
+            return [recipe_id for recipe_id, ingredients in recipes.items() if len(ingredients - pantry) <= 1]
+
+        scan_ms = _time_per_query(scan, pantries, repeat=1)
+        index_ms = _time_per_query(lambda pantry: index.search(pantry, max_missing=1), pantries)
+        print(f"{size:>8} {scan_ms:>12.2f} {index_ms:>11.3f} {scan_ms / index_ms:>7.1f}x")
+
+
+def bench_shared_cache(workers=(1, 2, 4, 8), request_count: int = 5000, cache_size: int = 100):
+    """Hit ratio of per-process caches versus one SQLite cache shared by every worker
+
+    Requests for a Zipf-distributed set of dishes are spread round-robin over
+    the workers, as a load balancer would; a miss is an OpenAI call.
+    """
+    from main import Cache
+
+    rng = random.Random(29)
+    dishes = synthetic_names(2000)
+    weights = [1 / (rank + 1) for rank in range(len(dishes))]
+    requests = rng.choices(dishes, weights, k=request_count)
+
+    def replay(caches):
+        hits = 0
+        for number, dish in enumerate(requests):
+            cache = caches[number % len(caches)]
+            if cache.get(dish) is None:
+                cache.set(dish, {"name": dish})
+            else:
+                hits += 1
+        return hits / len(requests)
+
+    print(f"{'workers':>8} {'per-process':>12} {'shared':>8} {'shared ms/op':>13}")
+    for count in workers:
+        per_process = replay([Cache(max_size=cache_size) for _ in range(count)])
+        with tempfile.TemporaryDirectory() as directory:
+            shared = PersistentCache("bench", path=os.path.join(directory, "cache.db"), max_entries=cache_size * count)
+            start = time.perf_counter()
+            shared_ratio = replay([shared] * count)
+            op_ms = (time.perf_counter() - start) / len(requests) * 1000
+            shared.close()
+        print(f"{count:>8} {per_process:>12.1%} {shared_ratio:>8.1%} {op_ms:>13.3f}")
+
+
+TRANSCRIPT_TEMPLATES = [
+    "how to make {dish}", "How to make {dish}?", "how do I make {dish}", "How do i make {dish}?",
+    "recipe for {dish}", "Recipe for {dish}, please", "um, recipe for {dish}", "I want to make {dish}",
+    "i want to make some {dish}", "show me how to make {dish}", "Can you help me make {dish}?",
+    "{dish}", "{dish}!", "hey, {dish} please", "cook {dish}", "prepare the {dish}",
+]
+
+
+def bench_extractor_cache(request_count: int = 20000, cache_sizes=(100, 1000)):
+    """Extractor cache hit rate on voice-style transcripts: raw lowercased keys vs normalized keys"""
+    from main import Cache, request_subject
+
+    rng = random.Random(31)
+    dishes = [' '.join(name.split()[:-1]) for name in synthetic_names(3000)]
+    weights = [1 / (rank + 1) for rank in range(len(dishes))]
+    transcripts = [rng.choice(TRANSCRIPT_TEMPLATES).format(dish=rng.choices(dishes, weights)[0])
+                   for _ in range(request_count)]
+
+    def hit_rate(key_of, max_size):
+        cache = Cache(max_size=max_size)
+        for transcript in transcripts:
+            key = key_of(transcript)
+            if cache.get(key) is None:
+                cache.set(key, transcript)
+        return cache.stats()["hit_rate"]
+
+    print(f"{'size':>6} {'raw keys':>9} {'normalized':>11} {'distinct raw':>13} {'distinct norm':>14}")
+    distinct_raw = len({transcript.lower() for transcript in transcripts})
+    distinct_normalized = len({request_subject(transcript) for transcript in transcripts})
+    for size in cache_sizes:
+        raw = hit_rate(str.lower, size)
+        normalized = hit_rate(request_subject, size)
+        print(f"{size:>6} {raw:>9.1%} {normalized:>11.1%} {distinct_raw:>13} {distinct_normalized:>14}")
+
+
+class SimulatedRecipeManager:
+    """Stand-in for RecipeManager's fetch paths, with random catalog and API delays
+
+    Dishes with an odd-length name are in the simulated catalog; every dish
+    can be generated by the simulated API, which honours its deadline.
+    """
+
+    client = True
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def _delay(self, low, high):
+        with self.lock:
+            return self.rng.uniform(low, high)
+
+    def _get_local_recipe(self, recipe_name):
+        time.sleep(self._delay(0, 0.03))
+        return {"name": recipe_name} if len(recipe_name) % 2 else None
+
+    def _get_recipe_from_api(self, recipe_name, deadline):
+        remaining = self._delay(0.01, 0.2)
+        while remaining > 0 and not deadline.expired():
+            time.sleep(min(0.01, remaining))
+            remaining -= 0.01
+        return None if deadline.expired() else {"name": recipe_name}
+
+
+def run_hedged_fetch(threads: int = 16, request_count: int = 400):
+    """Fetch distinct dishes concurrently through a HedgedRecipeFetcher over SimulatedRecipeManager
+
+    Returns the number of recipes found, the number of leaks (answers naming
+    another request's dish), the sorted latencies in milliseconds, the
+    fetcher's stats, and how many threads were left after shutdown.
+    """
+    import concurrent.futures
+    from main import HedgedRecipeFetcher
+
+    dishes = synthetic_names(request_count)
+    baseline_threads = threading.active_count()
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+    fetcher = HedgedRecipeFetcher(SimulatedRecipeManager(31), executor=pool, timeout=0.15, hedge_delay=0.01)
+    leaks = found = 0
+    latencies = []
+
+    def request(dish):
+        start = time.perf_counter()
+        recipe, _ = fetcher.fetch(dish)
+        return dish, recipe, (time.perf_counter() - start) * 1000
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as clients:
+        for dish, recipe, ms in clients.map(request, dishes):
+            latencies.append(ms)
+            if recipe is not None:
+                found += 1
+                leaks += recipe["name"] != dish
+    pool.shutdown(wait=True)
+    latencies.sort()
+    return found, leaks, latencies, fetcher.stats(), threading.active_count() - baseline_threads
+
+
+def bench_hedged_fetch(threads: int = 16, request_count: int = 400):
+    """Hedged fetch under concurrency: every answer must belong to its own request
+
+    A simulated catalog answers some dishes locally after a random delay and
+    leaves the rest to a slower simulated API, so late results from earlier
+    requests are still arriving while later requests wait. Any answer naming
+    another dish is counted as a leak; test_hedged_fetch.py checks there are none.
+    """
+    found, leaks, latencies, stats, threads_left = run_hedged_fetch(threads, request_count)
+    print(f"{'requests':>9} {'found':>6} {'leaks':>6} {'p50 ms':>7} {'p95 ms':>7} {'hedges':>7} {'timeouts':>9} {'cancelled':>10}")
+    print(f"{request_count:>9} {found:>6} {leaks:>6} {latencies[len(latencies) // 2]:>7.1f} "
+          f"{latencies[int(len(latencies) * 0.95)]:>7.1f} {stats['hedges']:>7} {stats['timeouts']:>9} {stats['cancelled']:>10}")
+    print(f"threads left after shutdown: {threads_left}")
+
+
+def nonsense_dishes(count: int, seed: int = 41):
+    """Dish names no catalog lookup or text search can match, so every request reaches the API"""
+    rng = random.Random(seed)
+
+    def word():
+        return ''.join(rng.choice("bcdfgklmnprstvz") + rng.choice("aeiou") for _ in range(rng.randint(2, 3)))
+
+    names = set()
+    while len(names) < count:
+        names.add(f"{word()} {word()}")
+    return sorted(names)
+
+
+def bench_openai_path(threads: int = 8, request_count: int = 80, latency: float = 0.08, jitter: float = 0.08):
+    """End-to-end query latency through extraction and generation against the local fake OpenAI server
+
+    Runs offline and is deterministic up to thread scheduling: the fake
+    server draws latency, 500s and 429s from a seeded generator. Each dish
+    is asked for twice, cold and then from the caches; a streamed request
+    reports time to the first recipe piece against time to the whole recipe.
+    """
+    import concurrent.futures
+    from sqlalchemy import create_engine
+    import cache_store
+    import main
+    from concurrency import TokenBucket
+    from fake_openai_server import FakeOpenAIServer
+    from models import Base
+    from openai_async import REQUEST_DEADLINE_SECONDS, STREAM_DEADLINE_SECONDS, Deadline
+    from recipe_store import RecipeStore
+    from warmup import QueryLog
+
+    server = FakeOpenAIServer(latency=latency, jitter=jitter, error_rate=0.03, rate_limit_rate=0.02,
+                              chunk_delay=0.005, seed=43).start()
+    saved = (main.client, main.OPENAI_RUNNER, dict(main.RATE_LIMITERS), cache_store.CACHE_DB_PATH)
+    directory = tempfile.TemporaryDirectory()
+    engine = create_engine(f"sqlite:///{os.path.join(directory.name, 'recipes.db')}")
+    Base.metadata.create_all(engine)
+    try:
+        main.configure_openai("fake", server.url)
+        # Measure latency, not the production call budget
+        main.RATE_LIMITERS.update(extraction=TokenBucket(1000, 1000), generation=TokenBucket(1000, 1000))
+        # Keep the made-up dishes out of the real cache file, query log and recipe store,
+        # or the next startup would warm them up against the real API
+        cache_store.CACHE_DB_PATH = os.path.join(directory.name, "cache.db")
+        manager = main.RecipeManager(query_log=QueryLog(''), recipe_store=RecipeStore(engine))
+        queries = [template.format(dish=dish) for template, dish in
+                   zip(TRANSCRIPT_TEMPLATES * request_count, nonsense_dishes(request_count))]
+
+        def run(query):
+            start = time.perf_counter()
+            recipe, source = manager.process_user_query(query, Deadline(REQUEST_DEADLINE_SECONDS))
+            return source, (time.perf_counter() - start) * 1000
+
+        print(f"{'pass':>6} {'requests':>9} {'found':>6} {'p50 ms':>7} {'p95 ms':>7} {'sources':>30}")
+        for label in ("cold", "warm"):
+            with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+                results = list(pool.map(run, queries))
+            latencies = sorted(ms for _, ms in results)
+            sources = Counter(source for source, _ in results)
+            print(f"{label:>6} {len(results):>9} {len(results) - sources[None]:>6} "
+                  f"{latencies[len(latencies) // 2]:>7.1f} {latencies[int(len(latencies) * 0.95)]:>7.1f} "
+                  f"{', '.join(f'{source}={count}' for source, count in sources.most_common()):>30}")
+
+        start = time.perf_counter()
+        first_piece = None
+        for event, _ in manager.stream_user_query(f"how do I make {nonsense_dishes(1, seed=47)[0]}",
+                                                 Deadline(STREAM_DEADLINE_SECONDS)):
+            if first_piece is None:
+                first_piece = (time.perf_counter() - start) * 1000
+        print(f"stream: first piece {first_piece:.1f} ms, complete recipe {(time.perf_counter() - start) * 1000:.1f} ms")
+        print(f"fake server: {server.stats()}")
+    finally:
+        main.client, main.OPENAI_RUNNER, limiters, cache_store.CACHE_DB_PATH = saved
+        main.RATE_LIMITERS.update(limiters)
+        server.stop()
+        engine.dispose()
+        directory.cleanup()
+
+
+BENCHMARKS = {
+    "autocomplete": bench_autocomplete,
+    "extractor_cache": bench_extractor_cache,
+    "fuzzy_match": bench_fuzzy_match,
+    "hedged_fetch": bench_hedged_fetch,
+    "name_lookup": bench_name_lookup,
+    "openai_path": bench_openai_path,
+    "pantry": bench_pantry,
+    "shared_cache": bench_shared_cache,
+    "text_search": bench_text_search,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run recipe search benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS), nargs="?", default=None,
+                        help="benchmark to run (default: all)")
+    args = parser.parse_args()
+    for name in ([args.benchmark] if args.benchmark else sorted(BENCHMARKS)):
+        print(f"== {name}")
+        BENCHMARKS[name]()
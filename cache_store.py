@@ -0,0 +1,238 @@
+"""
+Persistent cache tier backed by SQLite, so OpenAI results survive restarts,
+a two-tier cache that puts the in-memory LRU in front of it, and a rate
+limiter that every worker process on the host can share.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_DB_PATH = os.getenv('CACHE_DB_PATH', 'recipe_cache.db')
+
+
+def _open_database(path: str) -> sqlite3.Connection:
+    """Open a SQLite database for concurrent use by several threads and processes"""
+    # Autocommit mode, so BEGIN IMMEDIATE can take the write lock explicitly
+    connection = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class PersistentCache:
+    """JSON values in a SQLite table, with a TTL and a per-namespace entry limit
+
+    The database is opened on first use, so importing or constructing the
+    cache costs nothing. Several namespaces can share one database file, and
+    WAL mode lets every worker process on the host read and write it at once.
+    """
+
+    def __init__(self, namespace: str, path: str = None, ttl_minutes: float = 7 * 24 * 60,
+                 max_entries: int = 5000, trim_every: int = 100):
+        self.namespace = namespace
+        self.path = path or CACHE_DB_PATH
+        self.ttl = ttl_minutes * 60
+        self.max_entries = max_entries
+        self.trim_every = trim_every
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = _open_database(self.path)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS cache_entries_expiry ON cache_entries (namespace, expires_at)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with self.lock:
+                row = self._connect().execute(
+                    "SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                    (self.namespace, key, time.time())
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                return json.loads(row[0])
+        except sqlite3.Error as e:
+            logger.error(f"Persistent cache read failed: {e}")
+            return None
+
+    def set(self, key: str, value: Any):
+        try:
+            with self.lock:
+                connection = self._connect()
+                connection.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value), time.time() + self.ttl)
+                )
+                self._writes += 1
+                if self._writes % self.trim_every == 0:
+                    self._trim(connection)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"Persistent cache write failed: {e}")
+
+    def pop(self, key: str) -> Optional[Any]:
+        """Remove and return a live entry; the write lock makes this atomic across processes"""
+        try:
+            with self.lock:
+                connection = self._connect()
+                with connection:
+                    connection.execute("BEGIN IMMEDIATE")
+                    row = connection.execute(
+                        "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                        (self.namespace, key)
+                    ).fetchone()
+                    if row is not None:
+                        connection.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                                           (self.namespace, key))
+                if row is None or row[1] <= time.time():
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                return json.loads(row[0])
+        except sqlite3.Error as e:
+            logger.error(f"Persistent cache pop failed: {e}")
+            return None
+
+    def _trim(self, connection: sqlite3.Connection):
+        """Drop expired entries, then the soonest-expiring ones beyond max_entries"""
+        connection.execute("DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+                           (self.namespace, time.time()))
+        connection.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+            " SELECT key FROM cache_entries WHERE namespace = ?"
+            " ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_entries)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count for the namespace plus this process's hit and miss counters"""
+        try:
+            with self.lock:
+                size = self._connect().execute(
+                    "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+                ).fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
+
+    def close(self):
+        with self.lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class TieredCache:
+    """An in-memory cache in front of a persistent one, with the same get/set/pop interface
+
+    Persistent hits are copied into memory, so a warm restart pays the disk
+    lookup once per key.
+    """
+
+    def __init__(self, memory: Any, persistent: PersistentCache):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        self.persistent.set(key, value)
+
+    def pop(self, key: str) -> Optional[Any]:
+        value = self.memory.pop(key)
+        persisted = self.persistent.pop(key)
+        return value if value is not None else persisted
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats["persistent"] = self.persistent.stats()
+        return stats
+
+
+class SharedRateLimiter:
+    """Sliding-window call limit kept in SQLite, so it holds across worker processes"""
+
+    def __init__(self, name: str, max_calls: int, window_seconds: float, path: str = None):
+        self.name = name
+        self.max_calls = max_calls
+        self.window = window_seconds
+        self.path = path or CACHE_DB_PATH
+        self.lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = _open_database(self.path)
+            connection.execute("CREATE TABLE IF NOT EXISTS rate_limit_calls (name TEXT NOT NULL, called_at REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS rate_limit_calls_time ON rate_limit_calls (name, called_at)")
+            self._connection = connection
+        return self._connection
+
+    def try_acquire(self) -> bool:
+        """Record a call and return True if the window has room, else False"""
+        now = time.time()
+        try:
+            with self.lock:
+                connection = self._connect()
+                with connection:
+                    # The write lock serializes the check-and-insert across processes
+                    connection.execute("BEGIN IMMEDIATE")
+                    connection.execute("DELETE FROM rate_limit_calls WHERE name = ? AND called_at <= ?",
+                                       (self.name, now - self.window))
+                    recent = connection.execute("SELECT COUNT(*) FROM rate_limit_calls WHERE name = ?",
+                                                (self.name,)).fetchone()[0]
+                    if recent >= self.max_calls:
+                        return False
+                    connection.execute("INSERT INTO rate_limit_calls (name, called_at) VALUES (?, ?)",
+                                        (self.name, now))
+                    return True
+        except sqlite3.Error as e:
+            logger.error(f"Shared rate limiter failed: {e}")
+            return False
+
+    def acquire(self, timeout: float = 0, poll_interval: float = 0.1) -> bool:
+        """Like try_acquire, but keep trying for up to timeout seconds"""
+        if self.max_calls <= 0:
+            return False
+        deadline = time.monotonic() + timeout
+        while not self.try_acquire():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(poll_interval, remaining))
+        return True
@@ -0,0 +1,131 @@
+"""
+Concurrency helpers shared by the recipe services: single-flight request
+coalescing and a token-bucket rate limiter.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    """One in-flight execution that followers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.shared = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait and receive the same result, or the same exception.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return self._do(key, None, None, fn, args, kwargs)
+
+    def do_shared(self, key: Hashable, make_shared: Callable[[], Any], join: Callable[[Any], Any],
+                  fn: Callable[..., Any], *args) -> Any:
+        """Like do, with a value shared by every caller of one execution
+
+        The leader creates it with make_shared() and passes it to fn as the
+        last argument. Every caller, the leader included, passes it to
+        join() before the call runs or is waited on, e.g. to register
+        interest in a deadline the callers share.
+        """
+        return self._do(key, make_shared, join, fn, args, {})
+
+    def _do(self, key: Hashable, make_shared: Optional[Callable[[], Any]], join: Optional[Callable[[Any], Any]],
+            fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> Any:
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                call.shared = make_shared() if make_shared else None
+                self.executions += 1
+            else:
+                self.coalesced += 1
+            if join:
+                join(call.shared)
+        if make_shared:
+            args = (*args, call.shared)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Executions run, calls saved by sharing an in-flight result, and keys in flight"""
+        with self.lock:
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self.calls)
+            }
+
+
+class TokenBucket:
+    """Thread-safe token bucket: bursts up to `capacity`, refilled at `rate` tokens per second
+
+    Acquiring is O(1): tokens are topped up from the elapsed time on demand
+    rather than by tracking individual call timestamps.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.condition = threading.Condition()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens if available right now"""
+        return self.acquire(tokens, timeout=0)
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Take tokens, waiting up to timeout seconds (forever if None); False if they never came"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                if self.rate <= 0:
+                    # Never refilled, e.g. a budget of 0 calls per minute: waiting cannot help
+                    return False
+                wait = (tokens - self.tokens) / self.rate
+                if deadline is not None:
+                    if now >= deadline:
+                        return False
+                    wait = min(wait, deadline - now)
+                self.condition.wait(wait)
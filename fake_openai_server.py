@@ -0,0 +1,331 @@
+"""
+Local stand-in for the OpenAI chat-completions API, so the full API path
+can be benchmarked and load-tested offline and deterministically.
+
+Recipe prompts get a generated recipe for the requested dish, extraction
+prompts get the dish name, and canned outputs can override either. Latency,
+server errors and rate limiting are configurable; random choices come from
+a seeded generator, so a run can be repeated exactly.
+
+Usage:
+    python fake_openai_server.py [--port 8099] [--latency 0.5] [--jitter 0.2] [--error-rate 0.05]
+                                 [--rate-limit-rate 0.05] [--rpm 60] [--responses canned.jsonl]
+                                 [--upstream https://api.openai.com/v1 --record recorded.jsonl]
+
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 OPENAI_API_KEY=fake python app.py
+
+Canned outputs are JSON lines of {"match": "...", "content": "..."}; the first
+entry whose match occurs in the last user message (ignoring case) is the reply.
+With --upstream, conversations no canned entry matches are forwarded to a
+real OpenAI-compatible API (using OPENAI_API_KEY), and with --record each
+reply is appended to a file in the same format, ready to replay offline.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from concurrency import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+RECIPE_PROMPT = re.compile(r'recipe for (.+?) in JSON format', re.IGNORECASE)
+REQUEST_PHRASES = re.compile(
+    r'^(?:(?:um|uh|hey|please|so)[,\s]+)*(?:how (?:do i|to|can i) (?:make|cook|prepare)|'
+    r'(?:show me|tell me|teach me) how to (?:make|cook)|i want to (?:make|cook)|recipe for|'
+    r'can you help me (?:make|cook)|(?:make|cook|prepare))\s+(?:some |the |a )?',
+    re.IGNORECASE
+)
+INGREDIENTS = ["onion", "tomato", "garlic", "ginger", "cumin seeds", "turmeric", "chili powder",
+               "garam masala", "oil", "salt", "coriander leaves", "yogurt", "cream", "butter"]
+UNITS = ["pieces", "teaspoon", "tablespoons", "grams", "ml", "cup"]
+ACTIONS = ["Heat oil and temper the spices", "Saute the onions until golden", "Add the tomatoes and cook down",
+           "Stir in the main ingredient", "Simmer until cooked through", "Garnish and serve hot"]
+
+
+def dish_name(user_message: str) -> str:
+    """The dish in a voice-style request, as an extraction model would answer"""
+    text = REQUEST_PHRASES.sub('', user_message.strip()).strip(' ?!.,')
+    text = re.sub(r'[,\s]+please$', '', text, flags=re.IGNORECASE)
+    return text.title() or "Unknown Dish"
+
+
+def fake_recipe(name: str) -> Dict[str, Any]:
+    """A recipe in the catalog shape, the same every time for the same dish"""
+    rng = random.Random(zlib.crc32(name.lower().encode()))
+    steps = [{"step": action, "time": rng.randint(2, 15)} for action in ACTIONS[:rng.randint(3, len(ACTIONS))]]
+    return {
+        "name": name,
+        "cuisine_type": rng.choice(["North Indian", "South Indian", "Indo-Chinese", "Fusion"]),
+        "preparation_time": sum(step["time"] for step in steps),
+        "description": f"A home-style take on {name}",
+        "difficulty_level": rng.choice(["Easy", "Medium", "Hard"]),
+        "serving_size": rng.choice([2, 4, 6]),
+        "ingredients": [{"name": ingredient, "quantity": rng.randint(1, 4), "unit": rng.choice(UNITS)}
+                        for ingredient in rng.sample(INGREDIENTS, rng.randint(4, 8))],
+        "steps": steps
+    }
+
+
+def load_responses(path: str) -> List[Dict[str, str]]:
+    """Canned outputs from a JSON lines file of {"match", "content"} entries"""
+    with open(path, encoding='utf-8') as responses_file:
+        return [json.loads(line) for line in responses_file if line.strip()]
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections or cancelled streams are routine here
+        logger.debug(f"Connection from {client_address} ended abruptly", exc_info=True)
+
+
+class FakeOpenAIServer:
+    """Chat-completions server with configurable latency, failures and canned replies
+
+    Each request sleeps latency plus up to jitter seconds, then fails with a
+    500 at error_rate, with a 429 at rate_limit_rate or whenever the optional
+    requests-per-minute budget is spent, and otherwise answers. Streaming
+    requests are answered in chunk_size-character chunks, chunk_delay apart.
+    With an upstream URL, replies not canned come from that API instead of
+    being generated, and are appended to record_path when it is set.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, rpm: Optional[int] = None,
+                 responses: List[Dict[str, str]] = None, chunk_size: int = 8, chunk_delay: float = 0.01,
+                 seed: int = 0, upstream: Optional[str] = None, upstream_key: Optional[str] = None,
+                 record_path: Optional[str] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.bucket = TokenBucket(rpm / 60, rpm) if rpm else None
+        self.responses = responses or []
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.upstream = upstream.rstrip('/') if upstream else None
+        self.upstream_key = upstream_key
+        self.record_path = record_path
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "completions": 0, "streams": 0, "errors": 0, "rate_limited": 0,
+                         "forwarded": 0}
+        self.httpd = _QuietHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Base URL for the OpenAI client"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _count(self, name: str):
+        with self.lock:
+            self.counters[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counters)
+
+    def _draw(self) -> tuple:
+        """This request's delay and failure draws, taken together so runs are reproducible"""
+        with self.lock:
+            return self.latency + self.rng.uniform(0, self.jitter), self.rng.random(), self.rng.random()
+
+    def reply_to(self, messages: List[Dict[str, str]], request: Dict[str, Any] = None) -> str:
+        """Message content for a conversation: canned if one matches, else forwarded or generated"""
+        system = next((message["content"] for message in messages if message.get("role") == "system"), "")
+        user = next((message["content"] for message in reversed(messages) if message.get("role") == "user"), "")
+        with self.lock:
+            responses = list(self.responses)
+        for response in responses:
+            if response["match"].lower() in user.lower():
+                return response["content"]
+        if self.upstream:
+            return self._record(user, self._forward(dict(request or {}, messages=messages)))
+        recipe_request = RECIPE_PROMPT.search(user)
+        if recipe_request or "cooking expert" in system:
+            return json.dumps(fake_recipe(recipe_request.group(1) if recipe_request else dish_name(user)))
+        return dish_name(user)
+
+    def _forward(self, request: Dict[str, Any]) -> str:
+        """Message content of the same request answered by the upstream API, without streaming"""
+        request = {key: value for key, value in request.items() if key not in ("stream", "stream_options")}
+        upstream_request = urllib.request.Request(
+            f"{self.upstream}/chat/completions", data=json.dumps(request).encode(),
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {self.upstream_key}"}
+        )
+        with urllib.request.urlopen(upstream_request, timeout=60) as response:
+            body = json.loads(response.read())
+        self._count("forwarded")
+        return body["choices"][0]["message"]["content"]
+
+    def _record(self, user: str, content: str) -> str:
+        """Keep a forwarded reply for this run and, with record_path, for later offline runs"""
+        entry = {"match": user.strip(), "content": content}
+        with self.lock:
+            self.responses.append(entry)
+            if self.record_path:
+                with open(self.record_path, 'a', encoding='utf-8') as record_file:
+                    record_file.write(json.dumps(entry) + '\n')
+        return content
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _send_json(self, status: int, body: Dict[str, Any], headers: Dict[str, str] = None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _error(self, status: int, kind: str, message: str, headers: Dict[str, str] = None):
+                self._send_json(status, {"error": {"message": message, "type": kind, "code": kind}}, headers)
+
+            def do_GET(self):
+                if self.path.rstrip('/') == "/stats":
+                    self._send_json(200, server.stats())
+                else:
+                    self._error(404, "not_found", f"Unknown path {self.path}")
+
+            def do_POST(self):
+                if self.path.rstrip('/') not in ("/v1/chat/completions", "/chat/completions"):
+                    self._error(404, "not_found", f"Unknown path {self.path}")
+                    return
+                try:
+                    request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                    messages = request["messages"]
+                except (ValueError, KeyError) as e:
+                    self._error(400, "invalid_request_error", f"Malformed request: {e}")
+                    return
+
+                server._count("requests")
+                delay, error_draw, limit_draw = server._draw()
+                time.sleep(delay)
+                if error_draw < server.error_rate:
+                    server._count("errors")
+                    self._error(500, "server_error", "Simulated server error")
+                    return
+                if limit_draw < server.rate_limit_rate or (server.bucket and not server.bucket.try_acquire()):
+                    server._count("rate_limited")
+                    self._error(429, "rate_limit_exceeded", "Simulated rate limit", {"Retry-After": "1"})
+                    return
+
+                try:
+                    content = server.reply_to(messages, request)
+                except (OSError, ValueError, KeyError) as e:
+                    # Upstream unreachable, failing or answering in an unexpected shape
+                    server._count("errors")
+                    self._error(502, "upstream_error", f"Upstream request failed: {e}")
+                    return
+                model = request.get("model", "gpt-3.5-turbo")
+                if request.get("stream"):
+                    server._count("streams")
+                    self._stream(model, content)
+                else:
+                    server._count("completions")
+                    # Word counts stand in for token counts
+                    prompt_tokens = sum(len(message.get("content", "").split()) for message in messages)
+                    completion_tokens = len(content.split())
+                    self._send_json(200, {
+                        "id": f"chatcmpl-fake-{zlib.crc32(content.encode())}",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                     "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                                  "total_tokens": prompt_tokens + completion_tokens}
+                    })
+
+            def _stream(self, model: str, content: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                pieces = [content[i:i + server.chunk_size] for i in range(0, len(content), server.chunk_size)]
+                for number, piece in enumerate(pieces):
+                    chunk = {
+                        "id": "chatcmpl-fake-stream",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": piece},
+                                     "finish_reason": "stop" if number == len(pieces) - 1 else None}]
+                    }
+                    try:
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                        self.wfile.flush()
+                    except (BrokenPipeError, ConnectionResetError):
+                        # The client cancelled the stream
+                        return
+                    time.sleep(server.chunk_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self) -> "FakeOpenAIServer":
+        """Serve from a daemon thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake OpenAI chat-completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds, up to this much")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests failing with 429")
+    parser.add_argument("--rpm", type=int, default=None, help="requests per minute before answering 429")
+    parser.add_argument("--responses", help="JSON lines file of canned {match, content} replies")
+    parser.add_argument("--chunk-size", type=int, default=8, help="characters per streamed chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="seconds between streamed chunks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--upstream", help="forward replies not canned to this OpenAI-compatible base URL")
+    parser.add_argument("--record", help="append forwarded replies to this JSON lines file as {match, content}")
+    args = parser.parse_args()
+    if args.record and not args.upstream:
+        parser.error("--record needs --upstream")
+
+    logging.basicConfig(level=logging.INFO)
+    fake = FakeOpenAIServer(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                            error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, rpm=args.rpm,
+                            responses=load_responses(args.responses) if args.responses else None,
+                            chunk_size=args.chunk_size, chunk_delay=args.chunk_delay, seed=args.seed,
+                            upstream=args.upstream, upstream_key=os.getenv('OPENAI_API_KEY'),
+                            record_path=args.record)
+    print(f"Fake OpenAI API at {fake.url}")
+    try:
+        fake.httpd.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
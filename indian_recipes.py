@@ -3,7 +3,13 @@ This module contains a comprehensive collection of Indian recipes.
 Data sourced and adapted from various Indian cuisine datasets.
 """
 
+import hashlib
+import json
+import re
+import threading
 from difflib import SequenceMatcher
+from recipe_query import IndexPredicate, QueryPlanner, RangePredicate
+from search_index import BM25Index, FuzzyMatcher, PrefixIndex, RangeIndex, TrigramIndex, normalize_key, sequence_similarity
 
 INDIAN_RECIPES = {
     # North Indian Dishes
@@ -753,8 +759,197 @@ def similar(str1, str2, threshold=0.6):
     if str1_clean == str2_clean:
         return True
         
-    # Use SequenceMatcher for fuzzy matching
-    return SequenceMatcher(None, str1_clean, str2_clean).ratio() > threshold
+    # Bounded edit distance rules most pairs out before SequenceMatcher runs
+    return sequence_similarity(str1_clean, str2_clean, threshold) > threshold
+
+def _build_name_index():
+    """Build the trigram index over recipe names and their known variations"""
+    index = TrigramIndex()
+    for recipe_id, recipe in INDIAN_RECIPES.items():
+        index.add(recipe["name"], recipe_id)
+    for aliases in (RECIPE_VARIATIONS, ADDED_ALIASES):
+        for recipe_id, variations in aliases.items():
+            for variation in variations:
+                index.add(variation, recipe_id)
+    return index
+
+def _build_name_lookup():
+    """Map each normalized recipe name to the first recipe ID that uses it"""
+    lookup = {}
+    for recipe_id, recipe in INDIAN_RECIPES.items():
+        lookup.setdefault(normalize_key(recipe["name"]), recipe_id)
+    return lookup
+
+def _build_field_lookup(field):
+    """Map each normalized value of a recipe field to the recipe IDs that have it"""
+    lookup = {}
+    for recipe_id, recipe in INDIAN_RECIPES.items():
+        if field == "ingredients":
+            values = [ingredient["name"] for ingredient in recipe["ingredients"]]
+        else:
+            values = [recipe[field]]
+        for value in values:
+            lookup.setdefault(normalize_key(value), set()).add(recipe_id)
+    return lookup
+
+def _build_category_index(categories):
+    """Map each normalized category name to the set of catalog recipe IDs listed under it"""
+    return {
+        normalize_key(category): {recipe_id for recipe_id in recipe_ids if recipe_id in INDIAN_RECIPES}
+        for category, recipe_ids in categories.items()
+    }
+
+def total_step_time(recipe):
+    """Sum of the timed steps of a recipe, in minutes"""
+    return sum(step.get("time", 0) for step in recipe["steps"])
+
+def _build_range_indexes():
+    """Sorted indexes for the numeric fields that support range queries"""
+    return {
+        "preparation_time": RangeIndex((recipe["preparation_time"], recipe_id) for recipe_id, recipe in INDIAN_RECIPES.items()),
+        "serving_size": RangeIndex((recipe["serving_size"], recipe_id) for recipe_id, recipe in INDIAN_RECIPES.items()),
+        "total_time": RangeIndex((total_step_time(recipe), recipe_id) for recipe_id, recipe in INDIAN_RECIPES.items()),
+    }
+
+def recipe_text(recipe):
+    """Searchable free text of a recipe: description, ingredient names and step text"""
+    parts = [recipe.get("description", "")]
+    parts += [ingredient["name"] for ingredient in recipe["ingredients"]]
+    parts += [step["step"] for step in recipe["steps"]]
+    return " ".join(parts)
+
+def _build_text_index():
+    """Build the BM25 full-text index over every recipe's text"""
+    index = BM25Index()
+    for recipe_id, recipe in INDIAN_RECIPES.items():
+        index.add(recipe_id, recipe_text(recipe))
+    return index
+
+def _build_autocomplete_index():
+    """Build the typeahead index: recipe names, then aliases, then ingredients by popularity"""
+    index = PrefixIndex()
+    for recipe in INDIAN_RECIPES.values():
+        index.add(recipe["name"], "recipe", rank=0)
+    for variations in RECIPE_VARIATIONS.values():
+        for variation in variations:
+            index.add(variation, "alias", rank=1)
+    usage = {}
+    for recipe in INDIAN_RECIPES.values():
+        for ingredient in recipe["ingredients"]:
+            usage[ingredient["name"]] = usage.get(ingredient["name"], 0) + 1
+    for name, count in usage.items():
+        # Ingredients used by more recipes complete first
+        index.add(name, "ingredient", rank=2 + max(0, 10 - count))
+    # Sorted now, so concurrent queries never sort it themselves
+    index.build()
+    return index
+
+def content_hash(recipe):
+    """Stable hash of a recipe's JSON content, used as its HTTP ETag"""
+    canonical = json.dumps(recipe, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+def recipe_etag(recipe):
+    """Content hash of a recipe; precomputed for catalog recipes, computed on demand otherwise"""
+    return RECIPE_HASHES.get(id(recipe)) or content_hash(recipe)
+
+_catalog_version = 0
+
+def catalog_version():
+    """Counter bumped whenever the catalog changes; caches of "no match" results key on it"""
+    return _catalog_version
+
+def bump_catalog_version():
+    """Mark the catalog as changed, invalidating every cached negative result"""
+    global _catalog_version
+    _catalog_version += 1
+    return _catalog_version
+
+# Extra lookup names of recipes added at runtime, by recipe ID
+ADDED_ALIASES = {}
+
+# Lookup tables built at import, and rebuilt by add_recipes, so name queries avoid full catalog scans
+NAME_INDEX = _build_name_index()
+RECIPE_IDS_BY_NAME = _build_name_lookup()
+INGREDIENT_RECIPE_IDS = _build_field_lookup("ingredients")
+INGREDIENT_MATCHER = FuzzyMatcher(INGREDIENT_RECIPE_IDS)
+CUISINE_RECIPE_IDS = _build_field_lookup("cuisine_type")
+CUISINE_MATCHER = FuzzyMatcher(CUISINE_RECIPE_IDS)
+DIFFICULTY_RECIPE_IDS = _build_field_lookup("difficulty_level")
+CATEGORY_INDEXES = {
+    "spice_level": _build_category_index(SPICE_LEVELS),
+    "cooking_method": _build_category_index(COOKING_METHODS),
+    "dietary_restriction": _build_category_index(DIETARY_RESTRICTIONS),
+    "diet": _build_category_index(DIETARY_CATEGORIES),
+    "region": _build_category_index(REGIONAL_CUISINES),
+}
+RANGE_INDEXES = _build_range_indexes()
+TEXT_INDEX = _build_text_index()
+AUTOCOMPLETE_INDEX = _build_autocomplete_index()
+# Keyed by object identity: catalog recipes live for the whole process and are never mutated
+RECIPE_HASHES = {id(recipe): content_hash(recipe) for recipe in INDIAN_RECIPES.values()}
+RECIPE_POSITIONS = {recipe_id: position for position, recipe_id in enumerate(INDIAN_RECIPES)}
+VARIATION_KEYS = {recipe_id: {normalize_key(var) for var in variations} for recipe_id, variations in RECIPE_VARIATIONS.items()}
+VARIATION_POSITIONS = {recipe_id: position for position, recipe_id in enumerate(RECIPE_VARIATIONS)}
+
+# Serializes catalog additions; readers never lock, they use whichever indexes are current
+CATALOG_LOCK = threading.Lock()
+
+def recipe_id_for(name):
+    """Catalog ID for a recipe name, in the style of the built-in IDs ("butter_chicken")"""
+    return re.sub(r'[^a-z0-9]+', '_', normalize_key(name)).strip('_')
+
+def add_recipes(entries):
+    """Add (recipe_id, recipe, aliases) entries to the catalog, rebuilding the lookup indexes once
+
+    aliases are extra names that look a recipe up; entries whose ID is already
+    taken are skipped. Indexes are rebuilt as new objects and swapped in, so a
+    concurrent reader sees the old or the new catalog but never an index in
+    the middle of an update. The catalog version is bumped, so cached
+    "no match" results are dropped. Returns the IDs that were added.
+    """
+    global NAME_INDEX, INGREDIENT_RECIPE_IDS, INGREDIENT_MATCHER, CUISINE_RECIPE_IDS, CUISINE_MATCHER
+    global DIFFICULTY_RECIPE_IDS, RANGE_INDEXES, TEXT_INDEX, AUTOCOMPLETE_INDEX
+    with CATALOG_LOCK:
+        added = []
+        for recipe_id, recipe, aliases in entries:
+            if recipe_id in INDIAN_RECIPES:
+                continue
+            # The shared dicts only gain keys, and each key is set before anything can refer to it
+            RECIPE_HASHES[id(recipe)] = content_hash(recipe)
+            RECIPE_POSITIONS[recipe_id] = len(RECIPE_POSITIONS)
+            INDIAN_RECIPES[recipe_id] = recipe
+            for name in [recipe["name"], *aliases]:
+                RECIPE_IDS_BY_NAME.setdefault(normalize_key(name), recipe_id)
+            if aliases:
+                ADDED_ALIASES[recipe_id] = list(aliases)
+            added.append(recipe_id)
+        if not added:
+            return added
+
+        name_index = _build_name_index()
+        ingredient_ids = _build_field_lookup("ingredients")
+        cuisine_ids = _build_field_lookup("cuisine_type")
+        difficulty_ids = _build_field_lookup("difficulty_level")
+        ingredient_matcher = FuzzyMatcher(ingredient_ids)
+        cuisine_matcher = FuzzyMatcher(cuisine_ids)
+        range_indexes = _build_range_indexes()
+        text_index = _build_text_index()
+        autocomplete_index = _build_autocomplete_index()
+        # Lookup dicts go first: a reader holding a new matcher finds its keys in them
+        INGREDIENT_RECIPE_IDS, CUISINE_RECIPE_IDS, DIFFICULTY_RECIPE_IDS = ingredient_ids, cuisine_ids, difficulty_ids
+        NAME_INDEX, INGREDIENT_MATCHER, CUISINE_MATCHER = name_index, ingredient_matcher, cuisine_matcher
+        RANGE_INDEXES, TEXT_INDEX, AUTOCOMPLETE_INDEX = range_indexes, text_index, autocomplete_index
+        bump_catalog_version()
+    return added
+
+def add_recipe(recipe_id, recipe, aliases=()):
+    """Add one recipe to the catalog and every lookup index; False if the ID is already taken"""
+    return bool(add_recipes([(recipe_id, recipe, aliases)]))
+
+def name_candidates(name, limit=50):
+    """(name key, recipe ID) pairs sharing the most trigrams with name, from the current name index"""
+    return NAME_INDEX.candidates(name, limit)
 
 def get_recipe_by_name(name):
     """Enhanced recipe retrieval with better error handling"""
@@ -764,134 +959,183 @@ def get_recipe_by_name(name):
     name = name.lower().strip()
     
     # Direct match attempt
-    for recipe_id, recipe in INDIAN_RECIPES.items():
-        if recipe["name"].lower() == name:
-            return recipe
+    recipe_id = RECIPE_IDS_BY_NAME.get(normalize_key(name))
+    if recipe_id:
+        return INDIAN_RECIPES[recipe_id]
             
+    # Only names sharing trigrams with the query are worth scoring
+    candidates = NAME_INDEX.candidates(name)
+    
     # Check variations
-    for recipe_id, variations in RECIPE_VARIATIONS.items():
-        if any(similar(var, name) for var in variations):
-            return INDIAN_RECIPES.get(recipe_id)
+    matched_variations = [recipe_id for key, recipe_id in candidates
+                          if key in VARIATION_KEYS.get(recipe_id, ()) and similar(key, name)]
+    if matched_variations:
+        return INDIAN_RECIPES.get(min(matched_variations, key=VARIATION_POSITIONS.get))
             
     # Fuzzy matching
     best_match = None
-    best_ratio = 0
+    best_key = None
     
-    for recipe_id, recipe in INDIAN_RECIPES.items():
-        # Check main recipe name
-        ratio = SequenceMatcher(None, name, recipe["name"].lower()).ratio()
-        if ratio > 0.6 and ratio > best_ratio:
+    for key, recipe_id in candidates:
+        recipe = INDIAN_RECIPES.get(recipe_id)
+        if recipe is None:
+            continue
+        ratio = SequenceMatcher(None, name, key).ratio()
+        # Ties go to the recipe listed first in the catalog
+        rank = (ratio, -RECIPE_POSITIONS[recipe_id])
+        if ratio > 0.6 and (best_key is None or rank > best_key):
             best_match = recipe
-            best_ratio = ratio
-            
-        # Check variations
-        for variation in RECIPE_VARIATIONS.get(recipe_id, []):
-            ratio = SequenceMatcher(None, name, variation.lower()).ratio()
-            if ratio > 0.6 and ratio > best_ratio:
-                best_match = recipe
-                best_ratio = ratio
+            best_key = rank
     
     return best_match
 
+def _recipes_for_ids(recipe_ids):
+    """Resolve recipe IDs to recipes in catalog order"""
+    return [INDIAN_RECIPES[recipe_id] for recipe_id in sorted(recipe_ids, key=RECIPE_POSITIONS.get)]
+
 def get_recipes_by_cuisine(cuisine_type):
     """Get all recipes of a particular cuisine type with improved matching"""
     if not cuisine_type:
         return []
         
-    cuisine_type = cuisine_type.lower().strip()
-    recipes = []
+    cuisine_type = normalize_key(cuisine_type)
     
     # Try exact match first
-    for recipe in INDIAN_RECIPES.values():
-        if recipe["cuisine_type"].lower() == cuisine_type:
-            recipes.append(recipe)
+    recipe_ids = CUISINE_RECIPE_IDS.get(cuisine_type)
             
     # If no exact matches, try fuzzy matching
-    if not recipes:
-        for recipe in INDIAN_RECIPES.values():
-            if similar(recipe["cuisine_type"].lower(), cuisine_type):
-                recipes.append(recipe)
+    if not recipe_ids:
+        recipe_ids = set()
+        for cuisine, _ in CUISINE_MATCHER.within(cuisine_type, containment=True):
+            recipe_ids.update(CUISINE_RECIPE_IDS[cuisine])
     
-    return recipes
+    return _recipes_for_ids(recipe_ids)
+
+def get_category_recipe_ids(category_type, category):
+    """Recipe IDs filed under a category of one of the CATEGORY_INDEXES types"""
+    if not category:
+        return set()
+    return CATEGORY_INDEXES[category_type].get(normalize_key(category), set())
 
 def get_recipes_by_diet(diet_type):
     """Get all recipes of a particular dietary category"""
-    recipes = []
-    for recipe_id in DIETARY_CATEGORIES.get(diet_type, []):
-        if recipe_id in INDIAN_RECIPES:
-            recipes.append(INDIAN_RECIPES[recipe_id])
-    return recipes
+    return _recipes_for_ids(get_category_recipe_ids("diet", diet_type))
+
+def get_recipes_by_region(region):
+    """Get all recipes from a particular regional cuisine"""
+    return _recipes_for_ids(get_category_recipe_ids("region", region))
 
 def get_recipes_by_difficulty(difficulty):
     """Get all recipes of a particular difficulty level"""
-    return [recipe for recipe in INDIAN_RECIPES.values() 
-            if recipe["difficulty_level"] == difficulty]
+    if not difficulty:
+        return []
+    return _recipes_for_ids(DIFFICULTY_RECIPE_IDS.get(normalize_key(difficulty), set()))
+
+def get_recipes_in_range(field, low=None, high=None):
+    """Get recipes whose preparation_time, serving_size or total_time lies in [low, high]"""
+    return _recipes_for_ids(RANGE_INDEXES[field].between(low, high))
 
 def get_recipes_by_max_time(max_time):
     """Get all recipes that can be prepared within the specified time"""
-    return [recipe for recipe in INDIAN_RECIPES.values() 
-            if recipe["preparation_time"] <= max_time]
+    return get_recipes_in_range("preparation_time", high=max_time)
+
+def get_recipes_by_time_range(min_time=None, max_time=None):
+    """Get all recipes whose preparation time lies between min_time and max_time"""
+    return get_recipes_in_range("preparation_time", min_time, max_time)
+
+def get_recipes_by_serving_size(min_servings=None, max_servings=None):
+    """Get all recipes serving between min_servings and max_servings people"""
+    return get_recipes_in_range("serving_size", min_servings, max_servings)
+
+def autocomplete(prefix, limit=8, kinds=None):
+    """Ranked typeahead completions for a partial recipe or ingredient name
+
+    kinds optionally restricts results to "recipe", "alias" and/or "ingredient".
+    """
+    return [{"text": text, "type": kind} for text, kind in AUTOCOMPLETE_INDEX.complete(prefix, limit, kinds)]
+
+# Fraction of the best score the query's catalog words could give. Unlike a raw BM25
+# score it does not drift as the catalog grows; unknown words ("soup" in "tomato soup")
+# are left to min_term_ratio, so a dish the catalog lacks goes to the API instead
+TEXT_MATCH_MIN_RELATIVE_SCORE = 0.3
+
+def search_recipes_by_text(query, limit=5, min_term_ratio=0.6, min_relative_score=TEXT_MATCH_MIN_RELATIVE_SCORE):
+    """Full-text search over descriptions, ingredients and steps, best BM25 match first
+
+    A recipe must contain most of the query's words, including words the
+    catalog never uses, and score at least min_relative_score of the best
+    possible score for the words it does use.
+    """
+    if not query:
+        return []
+    return [INDIAN_RECIPES[recipe_id]
+            for recipe_id, _ in TEXT_INDEX.search(query, limit, min_term_ratio, min_relative_score)]
 
 def get_recipes_by_ingredient(ingredient_name):
     """Get all recipes that contain a specific ingredient"""
     if not ingredient_name:
         return []
         
-    ingredient_name = ingredient_name.lower().strip()
-    recipes = []
-    
-    for recipe in INDIAN_RECIPES.values():
-        for ingredient in recipe["ingredients"]:
-            if similar(ingredient["name"].lower(), ingredient_name):
-                recipes.append(recipe)
-                break
+    recipe_ids = set()
+    for ingredient, _ in INGREDIENT_MATCHER.within(ingredient_name, containment=True):
+        recipe_ids.update(INGREDIENT_RECIPE_IDS[ingredient])
     
-    return recipes 
+    return _recipes_for_ids(recipe_ids)
 
 def get_recipes_by_spice_level(spice_level):
     """Get all recipes of a particular spice level"""
-    return [recipe for recipe in INDIAN_RECIPES.values() 
-            if recipe["name"].lower() in [r.lower() for r in SPICE_LEVELS.get(spice_level, [])]]
+    return _recipes_for_ids(get_category_recipe_ids("spice_level", spice_level))
 
 def get_recipes_by_cooking_method(method):
     """Get all recipes using a particular cooking method"""
-    return [recipe for recipe in INDIAN_RECIPES.values() 
-            if recipe["name"].lower() in [r.lower() for r in COOKING_METHODS.get(method, [])]]
+    return _recipes_for_ids(get_category_recipe_ids("cooking_method", method))
 
 def get_recipes_by_dietary_restriction(restriction):
     """Get all recipes matching a dietary restriction"""
-    return [recipe for recipe in INDIAN_RECIPES.values() 
-            if recipe["name"].lower() in [r.lower() for r in DIETARY_RESTRICTIONS.get(restriction, [])]]
+    return _recipes_for_ids(get_category_recipe_ids("dietary_restriction", restriction))
 
-def get_recipe_suggestions(ingredients=None, cuisine_type=None, difficulty=None, spice_level=None, cooking_method=None):
+def category_predicates(**categories):
+    """Planner predicates for the CATEGORY_INDEXES filters given as keyword arguments"""
+    return [
+        IndexPredicate(f"{category_type}={category}", [get_category_recipe_ids(category_type, category)])
+        for category_type, category in categories.items() if category
+    ]
+
+def range_predicates(max_time=None, min_servings=None, max_total_time=None):
+    """Planner predicates for the RANGE_INDEXES filters that are set"""
+    bounds = [
+        ("preparation_time", None, max_time, f"preparation_time<={max_time}"),
+        ("serving_size", min_servings, None, f"serving_size>={min_servings}"),
+        ("total_time", None, max_total_time, f"total_time<={max_total_time}"),
+    ]
+    return [
+        RangePredicate(name, RANGE_INDEXES[field], low, high)
+        for field, low, high, name in bounds if low is not None or high is not None
+    ]
+
+QUERY_PLANNER = QueryPlanner()
+
+def get_recipe_suggestions(ingredients=None, cuisine_type=None, difficulty=None, spice_level=None, cooking_method=None,
+                           dietary_restriction=None, diet=None, region=None, max_time=None, min_servings=None):
     """Get recipe suggestions based on multiple criteria"""
-    suggestions = []
+    # Each criterion resolves to an indexed set of recipe IDs
+    predicates = [
+        IndexPredicate(f"ingredient={ingredient}", [INGREDIENT_RECIPE_IDS.get(normalize_key(ingredient), set())])
+        for ingredient in ingredients or []
+    ]
     
-    for recipe in INDIAN_RECIPES.values():
-        matches_criteria = True
+    if cuisine_type:
+        predicates.append(IndexPredicate(f"cuisine_type={cuisine_type}",
+                                         [CUISINE_RECIPE_IDS.get(normalize_key(cuisine_type), set())]))
         
-        if ingredients:
-            recipe_ingredients = [ing["name"].lower() for ing in recipe["ingredients"]]
-            if not all(ing.lower() in recipe_ingredients for ing in ingredients):
-                matches_criteria = False
-                
-        if cuisine_type and recipe["cuisine_type"].lower() != cuisine_type.lower():
-            matches_criteria = False
-            
-        if difficulty and recipe["difficulty_level"] != difficulty:
-            matches_criteria = False
-            
-        if spice_level:
-            recipe_name = recipe["name"].lower()
-            if recipe_name not in [r.lower() for r in SPICE_LEVELS.get(spice_level, [])]:
-                matches_criteria = False
-                
-        if cooking_method:
-            recipe_name = recipe["name"].lower()
-            if recipe_name not in [r.lower() for r in COOKING_METHODS.get(cooking_method, [])]:
-                matches_criteria = False
-                
-        if matches_criteria:
-            suggestions.append(recipe)
+    if difficulty:
+        predicates.append(IndexPredicate(f"difficulty={difficulty}",
+                                         [DIFFICULTY_RECIPE_IDS.get(normalize_key(difficulty), set())]))
+        
+    predicates += category_predicates(spice_level=spice_level, cooking_method=cooking_method,
+                                      dietary_restriction=dietary_restriction, diet=diet, region=region)
+    predicates += range_predicates(max_time=max_time, min_servings=min_servings)
             
-    return suggestions 
\ No newline at end of file
+    # The planner applies the most selective criterion first and stops once nothing is left
+    matching, _ = QUERY_PLANNER.execute(predicates, INDIAN_RECIPES)
+    return _recipes_for_ids(matching)
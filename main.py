@@ -1,30 +1,54 @@
 import speech_recognition as sr
 import json
+import re
 import time
+import base64
+import heapq
+import secrets
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine, or_
 from models import Base, Recipe, Ingredient
+from search_index import FuzzyMatcher, PantryIndex, RecipeMatrix, normalize_key, sequence_similarity
+from recipe_query import IndexPredicate, QueryPlanner, RecipeQuery
+from cache_store import PersistentCache, SharedRateLimiter, TieredCache
+from concurrency import SingleFlight, TokenBucket
+from warmup import QUERY_LOG_PATH, QueryLog
+from openai_async import OPENAI_BASE_URL, AsyncOpenAIRunner, Deadline, SharedDeadline
+from streaming import RecipeStreamParser, StreamBroadcast
+from recipe_schema import RECIPE_SCHEMA, RecipeValidationError, normalize_piece, parse_recipe, validate_recipe
+from recipe_store import RecipeStore
+import numpy as np
 import subprocess
-from difflib import SequenceMatcher
 from indian_recipes import (
+    CATALOG_LOCK,
     INDIAN_RECIPES,
+    RECIPE_IDS_BY_NAME,
+    RECIPE_POSITIONS,
+    add_recipe,
+    add_recipes,
+    catalog_version,
+    category_predicates,
+    range_predicates,
+    search_recipes_by_text,
     get_recipe_by_name,
     get_recipes_by_cuisine,
     get_recipes_by_diet,
     get_recipes_by_difficulty,
-    get_recipes_by_max_time
+    get_recipes_by_max_time,
+    name_candidates,
+    recipe_id_for
 )
 from openai import OpenAI
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import os
 from dotenv import load_dotenv
 import logging
 import random
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 import functools
-from datetime import datetime, timedelta
+from collections import Counter, OrderedDict
 import threading
-import queue
+import atexit
 import concurrent.futures
 import sys
 
@@ -39,29 +63,110 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def configure_openai(key: Optional[str], base_url: Optional[str] = None):
+    """(Re)create the OpenAI clients, e.g. against a local fake server; managers created afterwards use them"""
+    global client, OPENAI_RUNNER
+    try:
+        client = OpenAI(api_key=key, base_url=base_url)
+    except Exception as e:
+        logger.error(f"Failed to initialize OpenAI client: {e}")
+        client = None
+    
+    # Web requests with a deadline call OpenAI through the async client instead
+    OPENAI_RUNNER = AsyncOpenAIRunner(key, base_url) if client else None
+
 # Initialize OpenAI client
-try:
-    client = OpenAI(api_key=api_key)
-except Exception as e:
-    logger.error(f"Failed to initialize OpenAI client: {e}")
-    client = None
-
-# Rate limiting configuration
-API_CALLS = {}
-MAX_CALLS_PER_MINUTE = 20
+configure_openai(api_key, OPENAI_BASE_URL)
+
+def complete_chat(sync_client, deadline: Optional[Deadline], **request) -> str:
+    """Message content of a chat completion: async within the deadline when one is given, else blocking"""
+    if deadline is not None and OPENAI_RUNNER is not None:
+        return OPENAI_RUNNER.complete(deadline, **request)
+    response = sync_client.chat.completions.create(**request)
+    return response.choices[0].message.content
+
+# Suggestion score multipliers by difficulty level
+DIFFICULTY_WEIGHTS = {"easy": 1.1, "medium": 1.0, "hard": 0.9}
+
+# Cache sizing; override through the environment to tune from cache_stats()
+RECIPE_CACHE_SIZE = int(os.getenv('RECIPE_CACHE_SIZE', 100))
+RECIPE_CACHE_TTL_MINUTES = float(os.getenv('RECIPE_CACHE_TTL_MINUTES', 60))
+API_CACHE_SIZE = int(os.getenv('API_CACHE_SIZE', 50))
+API_CACHE_TTL_MINUTES = float(os.getenv('API_CACHE_TTL_MINUTES', 30))
+CURSOR_CACHE_SIZE = int(os.getenv('CURSOR_CACHE_SIZE', 200))
+# Pages of ranking saved behind a cursor; later pages re-run the query after the cursor position
+CURSOR_SNAPSHOT_PAGES = int(os.getenv('CURSOR_SNAPSHOT_PAGES', 3))
+EXTRACTION_CACHE_SIZE = int(os.getenv('EXTRACTION_CACHE_SIZE', 1000))
+# "No match" results are cached briefly so repeated unknown dishes return at once
+NEGATIVE_CACHE_SIZE = int(os.getenv('NEGATIVE_CACHE_SIZE', 500))
+NEGATIVE_CACHE_TTL_MINUTES = float(os.getenv('NEGATIVE_CACHE_TTL_MINUTES', 5))
+# On-disk tier under the OpenAI caches, kept across restarts
+PERSISTENT_CACHE_SIZE = int(os.getenv('PERSISTENT_CACHE_SIZE', 5000))
+PERSISTENT_CACHE_TTL_MINUTES = float(os.getenv('PERSISTENT_CACHE_TTL_MINUTES', 7 * 24 * 60))
+
+# A generated recipe served this many times is written into the local catalog (0 disables)
+PROMOTE_AFTER_REQUESTS = int(os.getenv('PROMOTE_AFTER_REQUESTS', 3))
+
+# "memory" keeps caches and the rate limit per process; "sqlite" shares them
+# between every worker process on the host through the cache database
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory').lower()
+
+# Rate limiting configuration: separate per-minute OpenAI budgets for name
+# extraction and recipe generation, each allowing a burst of its full budget
+EXTRACTION_CALLS_PER_MINUTE = int(os.getenv('EXTRACTION_CALLS_PER_MINUTE', 20))
+GENERATION_CALLS_PER_MINUTE = int(os.getenv('GENERATION_CALLS_PER_MINUTE', 20))
 RATE_LIMIT_WINDOW = 60  # seconds
+# How long a request with a deadline may wait for a rate-limit token
+RATE_LIMIT_WAIT_SECONDS = float(os.getenv('RATE_LIMIT_WAIT_SECONDS', 1))
+
+# Hedged recipe fetches: shared worker pool, time limit, and how long the local
+# lookup may run before the API call is started alongside it
+FETCH_POOL_SIZE = int(os.getenv('FETCH_POOL_SIZE', 8))
+FETCH_TIMEOUT_SECONDS = float(os.getenv('FETCH_TIMEOUT_SECONDS', 5))
+HEDGE_DELAY_SECONDS = float(os.getenv('HEDGE_DELAY_SECONDS', 0.1))
+FETCH_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=FETCH_POOL_SIZE, thread_name_prefix="recipe-fetch")
+atexit.register(FETCH_POOL.shutdown, wait=False, cancel_futures=True)
 
-def check_rate_limit():
-    """Check if we've exceeded API rate limits"""
-    current_time = time.time()
-    # Clean up old entries
-    API_CALLS.update({k: v for k, v in API_CALLS.items() if current_time - k < RATE_LIMIT_WINDOW})
-    # Count recent calls
-    recent_calls = sum(1 for k in API_CALLS.keys() if current_time - k < RATE_LIMIT_WINDOW)
-    if recent_calls >= MAX_CALLS_PER_MINUTE:
-        return False
-    API_CALLS[current_time] = True
-    return True
+def _rate_limiter(budget: str, calls: int):
+    if CACHE_BACKEND == 'sqlite':
+        return SharedRateLimiter(f"openai-{budget}", calls, RATE_LIMIT_WINDOW)
+    return TokenBucket(calls / RATE_LIMIT_WINDOW, calls)
+
+RATE_LIMITERS = {
+    "extraction": _rate_limiter("extraction", EXTRACTION_CALLS_PER_MINUTE),
+    "generation": _rate_limiter("generation", GENERATION_CALLS_PER_MINUTE),
+}
+
+def make_cache(namespace: str, max_size: int, ttl_minutes: float):
+    """A cache for the configured backend: per-process LRU, or shared SQLite"""
+    if CACHE_BACKEND == 'sqlite':
+        return PersistentCache(namespace, ttl_minutes=ttl_minutes, max_entries=max_size, trim_every=10)
+    return Cache(max_size=max_size, ttl_minutes=ttl_minutes)
+
+RECIPE_SCHEMA_JSON = json.dumps(RECIPE_SCHEMA, separators=(',', ':'))
+
+def recipe_request(recipe_name: str) -> Dict[str, Any]:
+    """Chat completion arguments asking the model for a recipe as JSON"""
+    return dict(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": "You are a cooking expert. Provide recipe details as a JSON object "
+                                          f"matching this JSON schema: {RECIPE_SCHEMA_JSON}"},
+            {"role": "user", "content": f"Provide a detailed recipe for {recipe_name} in JSON format with name, ingredients (with quantities), steps, cuisine_type, preparation_time, and difficulty_level."}
+        ],
+        # JSON mode: the reply is a single JSON object, though not checked against the schema
+        response_format={"type": "json_object"},
+        temperature=0.7,
+        max_tokens=500
+    )
+
+def check_rate_limit(budget: str = "generation", timeout: float = 0) -> bool:
+    """Take one call from the named OpenAI budget, waiting up to timeout seconds for it"""
+    return RATE_LIMITERS[budget].acquire(timeout=timeout)
+
+def rate_limit_wait(deadline: Optional[Deadline]) -> float:
+    """How long a call may wait for a rate-limit token: briefly, and only within a deadline"""
+    return 0 if deadline is None else min(RATE_LIMIT_WAIT_SECONDS, deadline.remaining())
 
 class CognitiveSpeech:
     """Handles natural language generation and conversation flow"""
@@ -132,105 +237,203 @@ class CognitiveSpeech:
         return instruction
 
 class Cache:
-    def __init__(self, max_size: int = 100, ttl_minutes: int = 60):
-        self.cache = {}
+    """Thread-safe LRU cache with a per-entry TTL and hit/miss/eviction counters
+
+    Entries expire lazily when read; a cleanup pass also sweeps expired
+    entries at most once per `cleanup_interval` seconds, on writes. A
+    `max_size` of 0 or less stores nothing, turning the cache off.
+    """
+
+    def __init__(self, max_size: int = 100, ttl_minutes: float = 60, cleanup_interval: float = 60):
+        self.cache = OrderedDict()
         self.max_size = max_size
-        self.ttl = timedelta(minutes=ttl_minutes)
+        self.ttl = ttl_minutes * 60
+        self.cleanup_interval = cleanup_interval
         self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._next_cleanup = time.monotonic() + cleanup_interval
+
+    def _live(self, key: str, now: float) -> bool:
+        """Whether key is present and unexpired; drops it if it has expired"""
+        item = self.cache.get(key)
+        if item is None:
+            return False
+        if item[1] <= now:
+            del self.cache[key]
+            self.expirations += 1
+            return False
+        return True
 
     def get(self, key: str) -> Optional[Any]:
         with self.lock:
-            if key in self.cache:
-                item = self.cache[key]
-                if datetime.now() - item['timestamp'] < self.ttl:
-                    return item['value']
-                else:
-                    del self.cache[key]
+            if self._live(key, time.monotonic()):
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return self.cache[key][0]
+            self.misses += 1
             return None
 
     def set(self, key: str, value: Any):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            if now >= self._next_cleanup:
+                self._cleanup(now)
+            if key in self.cache:
+                self.cache.move_to_end(key)
+            elif len(self.cache) >= self.max_size:
+                # Least recently used entry sits at the front
+                self.cache.popitem(last=False)
+                self.evictions += 1
+            self.cache[key] = (value, now + self.ttl)
+
+    def pop(self, key: str) -> Optional[Any]:
+        """Remove and return a live entry, so only one caller can consume it"""
         with self.lock:
-            if len(self.cache) >= self.max_size:
-                # Remove oldest items
-                oldest = sorted(self.cache.items(), key=lambda x: x[1]['timestamp'])[0][0]
-                del self.cache[oldest]
-            self.cache[key] = {
-                'value': value,
-                'timestamp': datetime.now()
+            if self._live(key, time.monotonic()):
+                self.hits += 1
+                return self.cache.pop(key)[0]
+            self.misses += 1
+            return None
+
+    def _cleanup(self, now: float):
+        expired = [key for key, (_, expires_at) in self.cache.items() if expires_at <= now]
+        for key in expired:
+            del self.cache[key]
+        self.expirations += len(expired)
+        self._next_cleanup = now + self.cleanup_interval
+
+    def stats(self) -> Dict[str, Any]:
+        """Current size and counters, for sizing the cache from real traffic"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.cache),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None
             }
 
+# Common recipe request patterns, matched on normalized text
+REQUEST_PATTERNS = [
+    "recipe for",
+    "how to make",
+    "how do i make",
+    "cook",
+    "prepare",
+    "can you help me make",
+    "show me how to make",
+    "i want to make"
+]
+
+# Words that never change which dish is meant
+FILLER_WORDS = {"a", "an", "the", "some", "please", "um", "uh", "hey", "ok", "okay", "so", "just"}
+
+def normalize_query(text: str) -> str:
+    """Lowercase request text with punctuation, filler words and extra whitespace removed"""
+    words = re.sub(r"[^\w\s]", " ", text.lower()).split()
+    return ' '.join(word for word in words if word not in FILLER_WORDS)
+
+def request_subject(text: str) -> str:
+    """The part of a normalized request after its request phrase, e.g. "butter chicken"
+
+    Inputs that differ only in phrasing ("how to make X?", "how do I make X")
+    share a subject, so it keys the extraction cache.
+    """
+    text = normalize_query(text)
+    padded = f" {text} "
+    for pattern in REQUEST_PATTERNS:
+        if f" {pattern} " in padded:
+            return padded.split(f" {pattern} ")[-1].strip()
+    return text
+
 class RecipeExtractor:
     def __init__(self):
         self.client = client
-        self.local_cache = {}
+        # Bounded and keyed by request_subject(), so rephrasings hit the same entry
+        self.local_cache = Cache(max_size=EXTRACTION_CACHE_SIZE, ttl_minutes=PERSISTENT_CACHE_TTL_MINUTES)
+        self.flight = SingleFlight()
+        self.persistent_cache = PersistentCache(
+            "extractions", ttl_minutes=PERSISTENT_CACHE_TTL_MINUTES, max_entries=PERSISTENT_CACHE_SIZE
+        )
 
     @retry(
         stop=stop_after_attempt(2),
         wait=wait_exponential(multiplier=1, min=2, max=4),
         retry=retry_if_exception_type(Exception)
     )
-    def extract_recipe_name(self, user_input: str) -> str:
+    def extract_recipe_name(self, user_input: str, deadline: Optional[Deadline] = None) -> str:
         """Extract recipe name from user input using AI with improved fallback"""
+        key = request_subject(user_input)
+        
         # First check local cache
-        if user_input.lower() in self.local_cache:
-            return self.local_cache[user_input.lower()]
+        cached_name = self.local_cache.get(key)
+        if cached_name:
+            return cached_name
+        
+        # Then names the AI extracted before a restart
+        persisted_name = self.persistent_cache.get(key)
+        if persisted_name:
+            self.local_cache.set(key, persisted_name)
+            return persisted_name
 
         # Try traditional extraction first
         recipe_name = self._traditional_extract(user_input)
         
         # If we have a clear recipe name from traditional extraction, use it
         if recipe_name and len(recipe_name.split()) <= 3:
-            self.local_cache[user_input.lower()] = recipe_name
+            self.local_cache.set(key, recipe_name)
             return recipe_name
 
-        # Only use AI if available and rate limit allows
-        if self.client and check_rate_limit():
-            try:
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are a recipe name extractor. Extract only the recipe name from the user's input. Respond with ONLY the recipe name, nothing else."},
-                        {"role": "user", "content": user_input}
-                    ],
-                    temperature=0.3,
-                    max_tokens=50
-                )
-                recipe_name = response.choices[0].message.content.strip()
-                self.local_cache[user_input.lower()] = recipe_name
-                return recipe_name
-            except Exception as e:
-                logger.error(f"AI extraction failed: {e}")
-                return self._traditional_extract(user_input)
+        # Only use AI if available; concurrent identical inputs share one call
+        if self.client:
+            return self.flight.do(key, self._ai_extract, user_input, key, recipe_name, deadline)
         
         return recipe_name
 
+    def _ai_extract(self, user_input: str, key: str, fallback: str, deadline: Optional[Deadline] = None) -> str:
+        """Ask the model for the recipe name, falling back when rate limited, on error or past the deadline"""
+        if not check_rate_limit("extraction", rate_limit_wait(deadline)):
+            return fallback
+        try:
+            content = complete_chat(
+                self.client,
+                deadline,
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "You are a recipe name extractor. Extract only the recipe name from the user's input. Respond with ONLY the recipe name, nothing else."},
+                    {"role": "user", "content": user_input}
+                ],
+                temperature=0.3,
+                max_tokens=50
+            )
+            recipe_name = content.strip()
+            self.local_cache.set(key, recipe_name)
+            self.persistent_cache.set(key, recipe_name)
+            return recipe_name
+        except Exception as e:
+            logger.error(f"AI extraction failed: {e}")
+            return self._traditional_extract(user_input)
+
     def _traditional_extract(self, user_input: str) -> str:
         """Enhanced traditional rule-based recipe name extraction"""
-        user_input = user_input.lower()
-        
-        # Common recipe request patterns
-        patterns = [
-            "recipe for",
-            "how to make",
-            "how do i make",
-            "cook",
-            "prepare",
-            "can you help me make",
-            "show me how to make",
-            "i want to make"
-        ]
+        user_input = normalize_query(user_input)
         
-        # Try to extract recipe name using patterns
-        for pattern in patterns:
-            if pattern in user_input:
-                recipe_name = user_input.split(pattern)[-1].strip()
-                # Clean up common words
-                for word in ["a", "an", "the", "some"]:
-                    recipe_name = recipe_name.replace(f" {word} ", " ")
-                return recipe_name.strip()
+        # Try to extract recipe name using the request patterns
+        subject = request_subject(user_input)
+        if subject != user_input:
+            return subject
         
         # If no pattern matches, try to find the recipe in our database
-        for recipe in INDIAN_RECIPES.values():
+        # A snapshot, since promoted recipes may be added while this runs
+        for recipe in list(INDIAN_RECIPES.values()):
             if recipe["name"].lower() in user_input:
                 return recipe["name"]
         
@@ -238,51 +441,102 @@ class RecipeExtractor:
         return ' '.join(word for word in user_input.split() 
                        if word not in ["recipe", "make", "cook", "how", "to", "can", "you", "help", "me"])
 
-class ParallelRecipeFetcher:
-    def __init__(self, recipe_manager):
+class HedgedRecipeFetcher:
+    """Per-request hedged fetch: the local lookup first, then the API if local is slow or misses
+
+    Each call waits only on its own futures, so a late result can never answer
+    another request. Once a winner is found or the deadline passes, queued work
+    is cancelled and an in-flight API call is aborted through its deadline.
+    Work runs on one bounded pool shared by every request.
+    """
+
+    def __init__(self, recipe_manager, executor: concurrent.futures.Executor = None,
+                 timeout: float = None, hedge_delay: float = None):
         self.recipe_manager = recipe_manager
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
-        self.result_queue = queue.Queue()
-
-    def fetch_recipe_parallel(self, recipe_name: str) -> Tuple[Dict[str, Any], str]:
-        """Fetch recipe from both database and API in parallel"""
-        def local_search():
-            start_time = time.time()
-            result = self.recipe_manager._get_local_recipe(recipe_name)
-            if result:
-                self.result_queue.put(("local", result, time.time() - start_time))
-
-        def api_search():
-            if client:
-                start_time = time.time()
-                result = self.recipe_manager._get_recipe_from_api(recipe_name)
-                if result:
-                    self.result_queue.put(("api", result, time.time() - start_time))
+        self.executor = executor or FETCH_POOL
+        self.timeout = FETCH_TIMEOUT_SECONDS if timeout is None else timeout
+        self.hedge_delay = HEDGE_DELAY_SECONDS if hedge_delay is None else hedge_delay
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "local_wins": 0, "api_wins": 0, "hedges": 0, "cancelled": 0, "timeouts": 0}
 
-        # Start both searches in parallel
-        future_local = self.executor.submit(local_search)
-        future_api = self.executor.submit(api_search)
+    def _count(self, name: str):
+        with self.lock:
+            self.counters[name] += 1
 
-        # Wait for first result or timeout after 5 seconds
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counters)
+
+    def fetch(self, recipe_name: str, deadline: Optional[Deadline] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """The first recipe found for the name with its source ("local" or "api"), or (None, None) in time"""
+        self._count("requests")
+        start_time = time.time()
+        # The API hedge gets its own deadline, so cancelling it leaves the request's intact
+        timeout = self.timeout if deadline is None else min(self.timeout, deadline.remaining())
+        api_deadline = Deadline(timeout)
+        expires_at = time.monotonic() + timeout
+        
+        pending = {self.executor.submit(self.recipe_manager._get_local_recipe, recipe_name): "local"}
+        hedge_at = time.monotonic() + self.hedge_delay
+        hedged = not self.recipe_manager.client
         try:
-            source, recipe, duration = self.result_queue.get(timeout=5)
-            logger.info(f"Recipe found from {source} in {duration:.2f} seconds")
-            return recipe, source
-        except queue.Empty:
-            logger.warning("No recipe found in time")
+            while pending or not hedged:
+                now = time.monotonic()
+                if now >= expires_at:
+                    self._count("timeouts")
+                    logger.warning("No recipe found in time")
+                    return None, None
+                if not hedged and (now >= hedge_at or "local" not in pending.values()):
+                    # Local is slow or came up empty: start the API hedge
+                    hedged = True
+                    self._count("hedges")
+                    pending[self.executor.submit(self.recipe_manager._get_recipe_from_api,
+                                                 recipe_name, api_deadline)] = "api"
+                    continue
+                wait_until = expires_at if hedged else min(hedge_at, expires_at)
+                done, _ = concurrent.futures.wait(pending, timeout=wait_until - now,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    source = pending.pop(future)
+                    try:
+                        recipe = future.result()
+                    except Exception as e:
+                        logger.error(f"{source} recipe fetch failed: {e}")
+                        continue
+                    if recipe:
+                        self._count(f"{source}_wins")
+                        logger.info(f"Recipe found from {source} in {time.time() - start_time:.2f} seconds")
+                        return recipe, source
             return None, None
         finally:
-            # Cancel remaining searches
-            future_local.cancel()
-            future_api.cancel()
+            # Work that is no longer needed: drop queued tasks and abort a running API call
+            for future in pending:
+                future.cancel()
+            if pending:
+                self._count("cancelled")
+            api_deadline.cancel()
 
 class RecipeManager:
-    def __init__(self):
+    def __init__(self, query_log: Optional[QueryLog] = None, recipe_store: Optional[RecipeStore] = None):
         self.recipes = INDIAN_RECIPES
-        self.recipe_cache = Cache(max_size=100, ttl_minutes=60)
-        self.api_cache = Cache(max_size=50, ttl_minutes=30)
+        self.client = client
+        self.recipe_cache = make_cache("recipes", RECIPE_CACHE_SIZE, RECIPE_CACHE_TTL_MINUTES)
+        self.api_cache = TieredCache(
+            Cache(max_size=API_CACHE_SIZE, ttl_minutes=API_CACHE_TTL_MINUTES),
+            PersistentCache("api_recipes", ttl_minutes=PERSISTENT_CACHE_TTL_MINUTES, max_entries=PERSISTENT_CACHE_SIZE)
+        )
+        self.negative_cache = make_cache("negative", NEGATIVE_CACHE_SIZE, NEGATIVE_CACHE_TTL_MINUTES)
+        self.api_flight = SingleFlight()
+        # Streamed generations in progress by dish, so concurrent streams share one model call
+        self.streams: Dict[str, StreamBroadcast] = {}
+        self.stream_lock = threading.Lock()
+        self.stream_counts = Counter()
+        self.query_log = query_log or QueryLog(QUERY_LOG_PATH)
         self.recipe_extractor = RecipeExtractor()
-        self.parallel_fetcher = None  # Will be initialized later
+        self.recipe_fetcher = HedgedRecipeFetcher(self)
+        self.recipe_store = recipe_store or RecipeStore()
+        self.promotion_counts = Counter()
+        self.promotion_lock = threading.Lock()
         self.context = {
             "current_recipe": None,
             "last_search": None,
@@ -292,30 +546,93 @@ class RecipeManager:
             "dietary_restrictions": [],
             "cuisine_preference": None
         }
-        self.recipe_index = self._build_recipe_index()
+        # Recipes promoted in earlier runs join the catalog before it is indexed
+        add_recipes([(recipe_id_for(recipe["name"]), recipe, ()) for recipe in self.recipe_store.load_all()])
+        self.refresh_catalog()
+        self.query_planner = QueryPlanner()
+        self.cursor_cache = make_cache("cursors", CURSOR_CACHE_SIZE, 10)
+        
+    def refresh_catalog(self):
+        """Rebuild this manager's indexes from the catalog, e.g. after recipes were added"""
+        with CATALOG_LOCK:
+            recipe_index = self._build_recipe_index()
+            recipe_ids = list(self.recipes)
+            difficulty_weights = {
+                recipe_id: DIFFICULTY_WEIGHTS.get(recipe['difficulty_level'].lower(), 1.0)
+                for recipe_id, recipe in self.recipes.items()
+            }
+        name_matcher = FuzzyMatcher(recipe_index['names'])
+        ingredient_matcher = FuzzyMatcher(recipe_index['ingredients'])
+        cuisine_matcher = FuzzyMatcher(recipe_index['cuisine_types'])
+        recipe_matrix = RecipeMatrix(recipe_ids, recipe_index['ingredients'], recipe_index['cuisine_types'],
+                                     difficulty_weights)
+        pantry_index = PantryIndex(recipe_ids, recipe_index['ingredients'])
+        # Swap in complete indexes only, so concurrent searches see the old or the new catalog
+        (self.recipe_index, self.name_matcher, self.ingredient_matcher, self.cuisine_matcher,
+         self.recipe_matrix, self.pantry_index) = (recipe_index, name_matcher, ingredient_matcher,
+                                                   cuisine_matcher, recipe_matrix, pantry_index)
         
-    def initialize_parallel_fetcher(self):
-        """Initialize parallel fetcher after self is fully initialized"""
-        self.parallel_fetcher = ParallelRecipeFetcher(self)
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Counters for each cache, keyed by cache name"""
+        return {
+            "recipe_cache": self.recipe_cache.stats(),
+            "api_cache": self.api_cache.stats(),
+            "cursor_cache": self.cursor_cache.stats(),
+            "negative_cache": self.negative_cache.stats()
+        }
+
+    def single_flight_stats(self) -> Dict[str, Dict[str, int]]:
+        """How many OpenAI calls were coalesced into another in-flight call"""
+        with self.stream_lock:
+            recipe_stream = {
+                "executions": self.stream_counts["executions"],
+                "coalesced": self.stream_counts["coalesced"],
+                "in_flight": len(self.streams)
+            }
+        return {
+            "recipe_api": self.api_flight.stats(),
+            "recipe_stream": recipe_stream,
+            "extraction": self.recipe_extractor.flight.stats()
+        }
+
+    @staticmethod
+    def _negative_key(scope: str, recipe_name: str) -> str:
+        """Negative-cache key; including the catalog version drops old entries when recipes are added"""
+        return f"{scope}:{catalog_version()}:{recipe_name.lower()}"
+
+    def _api_ruled_out(self, recipe_name: str) -> bool:
+        """Whether a miss for the name is worth caching: there is no API, or the model's answer was unusable
+
+        Rate limits, API errors and timeouts say nothing about the dish, so
+        misses caused by them are retried on the next request.
+        """
+        return not self.client or bool(self.negative_cache.get(self._negative_key("api", recipe_name)))
 
     def _build_recipe_index(self) -> Dict[str, set]:
         """Build an inverted index for faster recipe search"""
         index = {
+            'names': {},
             'ingredients': {},
             'cuisine_types': {},
             'difficulty_levels': {}
         }
         
         for recipe_id, recipe in self.recipes.items():
+            # Index names
+            name = normalize_key(recipe['name'])
+            if name not in index['names']:
+                index['names'][name] = set()
+            index['names'][name].add(recipe_id)
+            
             # Index ingredients
             for ingredient in recipe['ingredients']:
-                ing_name = ingredient['name'].lower()
+                ing_name = normalize_key(ingredient['name'])
                 if ing_name not in index['ingredients']:
                     index['ingredients'][ing_name] = set()
                 index['ingredients'][ing_name].add(recipe_id)
             
             # Index cuisine types
-            cuisine = recipe['cuisine_type'].lower()
+            cuisine = normalize_key(recipe['cuisine_type'])
             if cuisine not in index['cuisine_types']:
                 index['cuisine_types'][cuisine] = set()
             index['cuisine_types'][cuisine].add(recipe_id)
@@ -329,40 +646,40 @@ class RecipeManager:
         return index
 
     @functools.lru_cache(maxsize=128)
-    def _fuzzy_match_score(self, str1: str, str2: str) -> float:
-        """Cached fuzzy matching for strings"""
-        return SequenceMatcher(None, str1.lower(), str2.lower()).ratio()
+    def _fuzzy_match_score(self, str1: str, str2: str, threshold: float = 0.0) -> float:
+        """Cached fuzzy matching for strings; 0.0 when the score cannot exceed threshold"""
+        return sequence_similarity(normalize_key(str1), normalize_key(str2), threshold)
+
+    def process_user_query(self, user_input: str, deadline: Optional[Deadline] = None) -> Tuple[Dict[str, Any], str]:
+        """Process user query with improved error handling and fallback
 
-    def process_user_query(self, user_input: str) -> Tuple[Dict[str, Any], str]:
-        """Process user query with improved error handling and fallback"""
+        With a deadline, OpenAI calls go through the async client and the whole
+        query, retries included, gives up once the deadline passes.
+        """
         try:
+            self.query_log.record(user_input)
+            
             # Extract recipe name
-            recipe_name = self.recipe_extractor.extract_recipe_name(user_input)
+            recipe_name = self.recipe_extractor.extract_recipe_name(user_input, deadline)
             logger.info(f"Extracted recipe name: {recipe_name}")
             
             # Update context
             self.context["last_search"] = recipe_name
             
-            # Check cache first
-            cached_recipe = self.recipe_cache.get(recipe_name.lower())
-            if cached_recipe:
-                return cached_recipe, "cache"
-            
-            # Try local database first
-            local_recipe = self._get_local_recipe(recipe_name)
-            if local_recipe:
-                self.recipe_cache.set(recipe_name.lower(), local_recipe)
-                return local_recipe, "local"
-            
-            # Initialize parallel fetcher if needed
-            if not self.parallel_fetcher:
-                self.initialize_parallel_fetcher()
-            
-            # Try parallel search with timeout
-            recipe, source = self.parallel_fetcher.fetch_recipe_parallel(recipe_name)
+            recipe, source = self._find_known_recipe(user_input, recipe_name)
             if recipe:
-                self.recipe_cache.set(recipe_name.lower(), recipe)
+                self._record_api_recipe(recipe_name, recipe)
                 return recipe, source
+            if source == "negative":
+                return None, None
+            
+            # Hedged local/API fetch with timeout, unless the request is already out of time
+            if deadline is None or not deadline.expired():
+                recipe, source = self.recipe_fetcher.fetch(recipe_name, deadline)
+                if recipe:
+                    self.recipe_cache.set(recipe_name.lower(), recipe)
+                    self._record_api_recipe(recipe_name, recipe)
+                    return recipe, source
             
             # If no exact match found, try fuzzy matching
             similar_recipes = self.find_similar_recipes(recipe_name)
@@ -370,30 +687,109 @@ class RecipeManager:
                 self.context["search_results"] = similar_recipes
                 return similar_recipes[0], "similar"
             
+            if self._api_ruled_out(recipe_name):
+                self.negative_cache.set(self._negative_key("query", recipe_name), True)
             return None, None
             
         except Exception as e:
             logger.error(f"Error in process_user_query: {e}")
             return None, None
 
+    def _find_known_recipe(self, user_input: str, recipe_name: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Look a query up in the cache, the catalog and the text index, without calling the API
+
+        The source is "negative" when a recent search for the name found nothing.
+        """
+        # Check cache first
+        cached_recipe = self.recipe_cache.get(recipe_name.lower())
+        if cached_recipe:
+            return cached_recipe, "cache"
+        
+        # A recent search for this name found nothing anywhere
+        if self.negative_cache.get(self._negative_key("query", recipe_name)):
+            return None, "negative"
+        
+        # Try local database first
+        local_recipe = self._get_local_recipe(recipe_name)
+        if local_recipe:
+            self.recipe_cache.set(recipe_name.lower(), local_recipe)
+            return local_recipe, "local"
+        
+        # Full-text search over descriptions, ingredients and steps before going to the API
+        text_matches = search_recipes_by_text(user_input)
+        if text_matches:
+            self.context["search_results"] = text_matches
+            return text_matches[0], "text"
+        
+        return None, None
+
+    def stream_user_query(self, user_input: str, deadline: Optional[Deadline] = None) -> Iterator[Tuple[str, Any]]:
+        """Like process_user_query, but a recipe the model has to write is streamed as it arrives
+
+        Yields ("name" | "ingredient" | "step" | "field", data) pieces while the
+        model writes, then ("recipe", {"recipe", "source"}) once a recipe is
+        complete, or ("not_found", None) when nothing matched.
+        """
+        self.query_log.record(user_input)
+        recipe_name = self.recipe_extractor.extract_recipe_name(user_input, deadline)
+        logger.info(f"Extracted recipe name: {recipe_name}")
+        self.context["last_search"] = recipe_name
+        
+        recipe, source = self._find_known_recipe(user_input, recipe_name)
+        if recipe is None and source != "negative" and self.client and (deadline is None or not deadline.expired()):
+            recipe = yield from self._stream_recipe_shared(recipe_name, deadline)
+            source = "api"
+            if recipe:
+                self.recipe_cache.set(recipe_name.lower(), recipe)
+        
+        if recipe is None and source != "negative":
+            similar_recipes = self.find_similar_recipes(recipe_name)
+            if similar_recipes:
+                self.context["search_results"] = similar_recipes
+                recipe, source = similar_recipes[0], "similar"
+            elif self._api_ruled_out(recipe_name):
+                self.negative_cache.set(self._negative_key("query", recipe_name), True)
+        
+        if recipe:
+            self._record_api_recipe(recipe_name, recipe)
+            yield "recipe", {"recipe": recipe, "source": source}
+        else:
+            yield "not_found", None
+
     def find_similar_recipes(self, recipe_name: str, threshold: float = 0.6) -> List[Dict[str, Any]]:
         """Find similar recipes using fuzzy matching"""
         similar_recipes = []
-        for recipe in self.recipes.values():
-            ratio = SequenceMatcher(None, recipe_name.lower(), recipe["name"].lower()).ratio()
-            if ratio > threshold:
-                recipe_copy = recipe.copy()
+        for name, ratio in self.name_matcher.within(recipe_name, threshold):
+            for recipe_id in sorted(self.recipe_index['names'][name], key=RECIPE_POSITIONS.get):
+                recipe_copy = self.recipes[recipe_id].copy()
                 recipe_copy["match_score"] = ratio
                 similar_recipes.append(recipe_copy)
         
-        return sorted(similar_recipes, key=lambda x: x["match_score"], reverse=True)
+        return similar_recipes
+
+    def warm_query(self, user_input: str) -> bool:
+        """Fill the extractor, recipe and API caches for a query without touching the context"""
+        recipe_name = self.recipe_extractor.extract_recipe_name(user_input)
+        # Warm-up is not a served request, so it must not bring a promotion closer
+        recipe, _ = self.get_recipe_details(recipe_name, count=False)
+        return recipe is not None
+
+    def get_recipe_details(self, recipe_name: str, count: bool = True) -> Tuple[Dict[str, Any], bool]:
+        """Get recipe details from cache, local database, or API
 
-    def get_recipe_details(self, recipe_name: str) -> Tuple[Dict[str, Any], bool]:
-        """Get recipe details from cache, local database, or API"""
+        Returns the recipe and whether it comes from the local catalog, so a
+        cached generated recipe is still reported as generated. With count
+        False, a generated recipe is not counted toward its promotion.
+        """
         # Check cache first
         cached_recipe = self.recipe_cache.get(recipe_name.lower())
         if cached_recipe:
-            return cached_recipe, True
+            if count:
+                self._record_api_recipe(recipe_name, cached_recipe)
+            return cached_recipe, self._is_catalog_recipe(cached_recipe)
+
+        if self.negative_cache.get(self._negative_key("details", recipe_name)):
+            return None, False
 
         # Try local database with exact and fuzzy matching
         local_recipe = self._get_local_recipe(recipe_name)
@@ -406,141 +802,371 @@ class RecipeManager:
             api_recipe = self._get_recipe_from_api(recipe_name)
             if api_recipe:
                 self.recipe_cache.set(recipe_name.lower(), api_recipe)
+                if count:
+                    self._record_api_recipe(recipe_name, api_recipe)
                 return api_recipe, False
 
+        if self._api_ruled_out(recipe_name):
+            self.negative_cache.set(self._negative_key("details", recipe_name), True)
         return None, False
 
+    @staticmethod
+    def _is_catalog_recipe(recipe: Dict[str, Any]) -> bool:
+        """Whether a recipe is in the local catalog, including promoted ones"""
+        return normalize_key(recipe.get("name", "")) in RECIPE_IDS_BY_NAME
+
+    def _record_api_recipe(self, recipe_name: str, recipe: Dict[str, Any]):
+        """Count a served generated recipe, promoting it once it reaches PROMOTE_AFTER_REQUESTS"""
+        # Catalog recipes, including already promoted ones, are served locally anyway
+        if not PROMOTE_AFTER_REQUESTS or self._is_catalog_recipe(recipe):
+            return
+        key = normalize_key(recipe_name)
+        with self.promotion_lock:
+            self.promotion_counts[key] += 1
+            if self.promotion_counts[key] < PROMOTE_AFTER_REQUESTS:
+                return
+            del self.promotion_counts[key]
+        self.promote_recipe(recipe, aliases=[recipe_name])
+
+    def promote_recipe(self, recipe: Dict[str, Any], aliases: List[str] = ()) -> bool:
+        """Write a generated recipe through to the recipe store and the in-memory catalog
+
+        The recipe is validated again first, since cached entries may predate
+        validation. aliases (e.g. the name the user asked for) also resolve to
+        it locally until restart.
+        """
+        try:
+            recipe = validate_recipe(recipe)
+        except RecipeValidationError as e:
+            logger.warning(f"Not promoting invalid recipe: {e}")
+            return False
+        recipe_id = recipe_id_for(recipe["name"])
+        with self.promotion_lock:
+            if (not recipe_id or recipe_id in self.recipes
+                    or normalize_key(recipe["name"]) in RECIPE_IDS_BY_NAME
+                    or not self.recipe_store.save(recipe)):
+                return False
+            add_recipe(recipe_id, recipe, aliases)
+        self.refresh_catalog()
+        logger.info(f"Promoted generated recipe '{recipe['name']}' into the local catalog")
+        return True
+
     def _get_local_recipe(self, recipe_name: str) -> Optional[Dict[str, Any]]:
         """Get recipe from local database with optimized search"""
         # Try exact match first (O(1) operation)
-        for recipe in self.recipes.values():
-            if recipe["name"].lower() == recipe_name.lower():
-                return recipe
+        recipe_id = RECIPE_IDS_BY_NAME.get(normalize_key(recipe_name))
+        if recipe_id in self.recipes:
+            return self.recipes[recipe_id]
         
         # If no exact match, try fuzzy matching with threshold
         best_match = None
         highest_ratio = 0
         
-        # Use only the first word for initial filtering
+        # Use the trigram index and the first word for initial filtering
         first_word = recipe_name.lower().split()[0]
-        candidates = [r for r in self.recipes.values() 
-                     if first_word in r["name"].lower()]
+        candidate_ids = {recipe_id for _, recipe_id in name_candidates(recipe_name)}
+        candidates = [self.recipes[recipe_id] for recipe_id in sorted(candidate_ids, key=RECIPE_POSITIONS.get)
+                      if recipe_id in self.recipes and first_word in self.recipes[recipe_id]["name"].lower()]
         
         # Perform fuzzy matching only on filtered candidates
         for recipe in candidates:
-            ratio = self._fuzzy_match_score(recipe_name, recipe["name"])
+            ratio = self._fuzzy_match_score(recipe_name, recipe["name"], 0.6)
             if ratio > highest_ratio and ratio > 0.6:
                 highest_ratio = ratio
                 best_match = recipe
         
         return best_match
 
-    @retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def _get_recipe_from_api(self, recipe_name: str) -> Optional[Dict[str, Any]]:
+    def _get_recipe_from_api(self, recipe_name: str, deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """Get recipe from OpenAI API; concurrent requests for one dish share a single call
+
+        When the first caller has a deadline, the shared call gets its own of
+        FETCH_TIMEOUT_SECONDS, the longest a fetch waits, and is cancelled
+        only once every caller waiting on it has cancelled theirs.
+        """
+        return self.api_flight.do_shared(
+            normalize_key(recipe_name),
+            lambda: SharedDeadline(FETCH_TIMEOUT_SECONDS) if deadline is not None else None,
+            lambda shared: shared.join(deadline) if shared is not None else None,
+            self._fetch_recipe_from_api, recipe_name
+        )
+
+    def _fetch_recipe_from_api(self, recipe_name: str, deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
         """Get recipe from OpenAI API with improved rate limiting"""
-        if not check_rate_limit():
+        # Cached responses cost no API call, so they are served even when rate limited
+        cached_response = self.api_cache.get(recipe_name.lower())
+        if cached_response:
+            return cached_response
+        
+        # The model recently failed to produce a usable recipe for this name
+        if self.negative_cache.get(self._negative_key("api", recipe_name)):
+            return None
+        
+        if not check_rate_limit("generation", rate_limit_wait(deadline)):
             logger.warning("API rate limit reached, using local database")
             return None
             
         try:
-            # Check API cache first
-            cached_response = self.api_cache.get(recipe_name.lower())
-            if cached_response:
-                return cached_response
-
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a cooking expert. Provide recipe details in JSON format."},
-                    {"role": "user", "content": f"Provide a detailed recipe for {recipe_name} in JSON format with name, ingredients (with quantities), steps, cuisine_type, preparation_time, and difficulty_level."}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
+            content = complete_chat(self.client, deadline, **recipe_request(recipe_name))
 
             try:
-                recipe_data = json.loads(response.choices[0].message.content)
+                # Validated before caching; truncated or slightly malformed JSON is repaired locally
+                recipe_data = parse_recipe(content, recipe_name)
                 self.api_cache.set(recipe_name.lower(), recipe_data)
+                # A slow answer may arrive after the query was already recorded as unmatched
+                self.negative_cache.pop(self._negative_key("query", recipe_name))
                 return recipe_data
-            except json.JSONDecodeError:
-                logger.error("Failed to parse API response as JSON")
+            except RecipeValidationError as e:
+                logger.error(f"Unusable API recipe: {e}")
+                self.negative_cache.set(self._negative_key("api", recipe_name), True)
                 return None
 
         except Exception as e:
             logger.error(f"API error: {str(e)}")
             return None
 
+    def _stream_recipe_shared(self, recipe_name: str, deadline: Optional[Deadline] = None) -> Iterator[Tuple[str, Any]]:
+        """Stream a generated recipe; concurrent requests for one dish follow a single model stream
+
+        The first request runs the stream and publishes its pieces. If it is
+        abandoned, e.g. because its client disconnected, followers get None.
+        """
+        key = normalize_key(recipe_name)
+        with self.stream_lock:
+            broadcast = self.streams.get(key)
+            leader = broadcast is None
+            if leader:
+                broadcast = self.streams[key] = StreamBroadcast()
+            self.stream_counts["executions" if leader else "coalesced"] += 1
+        if not leader:
+            return (yield from broadcast.follow(deadline))
+        
+        recipe = None
+        pieces = self._stream_recipe_from_api(recipe_name, deadline)
+        try:
+            while True:
+                try:
+                    event = next(pieces)
+                except StopIteration as stop:
+                    recipe = stop.value
+                    return recipe
+                broadcast.publish(event)
+                yield event
+        finally:
+            pieces.close()
+            with self.stream_lock:
+                del self.streams[key]
+            broadcast.finish(recipe)
+
+    def _stream_recipe_from_api(self, recipe_name: str, deadline: Optional[Deadline] = None) -> Iterator[Tuple[str, Any]]:
+        """Generate a recipe in streaming mode, yielding its pieces; returns the parsed recipe or None"""
+        cached_response = self.api_cache.get(recipe_name.lower())
+        if cached_response:
+            return cached_response
+        
+        if self.negative_cache.get(self._negative_key("api", recipe_name)):
+            return None
+        
+        if not check_rate_limit("generation", rate_limit_wait(deadline)):
+            logger.warning("API rate limit reached, using local database")
+            return None
+        
+        parser = RecipeStreamParser()
+        try:
+            timeout = deadline.remaining() if deadline else None
+            with self.client.chat.completions.create(stream=True, timeout=timeout,
+                                                     **recipe_request(recipe_name)) as stream:
+                for chunk in stream:
+                    if deadline is not None and deadline.expired():
+                        logger.warning("Recipe stream did not finish within the deadline")
+                        return None
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        # Pieces get the same shape as the final recipe, not the model's raw output
+                        for event in parser.feed(chunk.choices[0].delta.content):
+                            event = normalize_piece(*event)
+                            if event is not None:
+                                yield event
+        except Exception as e:
+            logger.error(f"API streaming error: {str(e)}")
+            return None
+        
+        try:
+            recipe_data = parser.result()
+            recipe_data = (validate_recipe(recipe_data, recipe_name) if recipe_data is not None
+                           else parse_recipe(parser.text, recipe_name))
+        except RecipeValidationError as e:
+            logger.error(f"Unusable streamed API recipe: {e}")
+            self.negative_cache.set(self._negative_key("api", recipe_name), True)
+            return None
+        self.api_cache.set(recipe_name.lower(), recipe_data)
+        self.negative_cache.pop(self._negative_key("query", recipe_name))
+        return recipe_data
+
     def get_recipe_suggestions(self, ingredients: List[str] = None, cuisine: str = None) -> List[Dict[str, Any]]:
-        """Get recipe suggestions using indexed search"""
-        matching_recipes = set()
-        
-        if ingredients:
-            # Find recipes matching ingredients using index
-            for ingredient in ingredients:
-                ing_matches = set()
-                for indexed_ing in self.recipe_index['ingredients']:
-                    if self._fuzzy_match_score(ingredient, indexed_ing) > 0.6:
-                        ing_matches.update(self.recipe_index['ingredients'][indexed_ing])
-                
-                if not matching_recipes:
-                    matching_recipes = ing_matches
-                else:
-                    matching_recipes &= ing_matches
-        
-        if cuisine:
-            # Filter by cuisine using index
-            cuisine_matches = set()
-            for indexed_cuisine in self.recipe_index['cuisine_types']:
-                if self._fuzzy_match_score(cuisine, indexed_cuisine) > 0.6:
-                    cuisine_matches.update(self.recipe_index['cuisine_types'][indexed_cuisine])
-            
-            if matching_recipes:
-                matching_recipes &= cuisine_matches
-            else:
-                matching_recipes = cuisine_matches
-        
-        if not matching_recipes and not ingredients and not cuisine:
-            # If no filters, return all recipes
-            matching_recipes = set(self.recipes.keys())
-        
-        # Convert recipe IDs to full recipes and calculate scores
-        scored_recipes = []
-        for recipe_id in matching_recipes:
+        """Get recipe suggestions for ingredients and/or a cuisine"""
+        return self.search(RecipeQuery(ingredients=ingredients or [], cuisine=cuisine))["suggestions"]
+
+    def find_pantry_recipes(self, ingredients: List[str] = None, max_missing: int = 0) -> List[Dict[str, Any]]:
+        """Recipes cookable from the pantry (default: context['available_ingredients'])
+
+        Pantry items are fuzzy-matched to catalog ingredient names, so "onions"
+        counts as "onion". Recipes missing up to max_missing ingredients are
+        included, fewest missing first.
+        """
+        if ingredients is None:
+            ingredients = self.context["available_ingredients"]
+        pantry = set()
+        for ingredient in ingredients:
+            pantry.update(key for key, _ in self.ingredient_matcher.within(ingredient, 0.8))
+        
+        results = []
+        for recipe_id, missing in self.pantry_index.search(pantry, max_missing):
             recipe = self.recipes[recipe_id]
-            score = self._calculate_recipe_score(recipe, ingredients, cuisine)
-            scored_recipes.append({
+            results.append({
                 "name": recipe["name"],
-                "score": score,
+                "missing_ingredients": self.pantry_index.names_of(missing),
                 "cuisine": recipe["cuisine_type"],
                 "description": recipe["description"],
                 "difficulty": recipe["difficulty_level"],
                 "time": recipe["preparation_time"]
             })
+        return results
+
+    def search(self, query: RecipeQuery, explain: bool = False) -> Dict[str, Any]:
+        """Run a structured recipe query: plan the filters, then score the survivors as arrays
+
+        Results come back `query.limit` at a time. When more remain, the result
+        carries a `next_cursor`; passing it back as `query.cursor` (with the same
+        query) continues from the saved ranking instead of re-scoring. Only the
+        next CURSOR_SNAPSHOT_PAGES pages are saved; past them, or once the
+        snapshot has expired, the query is re-run from the cursor position.
+        """
+        after = None
+        fingerprint = query.fingerprint()
+        if query.cursor:
+            snapshot_id, after, cursor_fingerprint = self._decode_cursor(query.cursor)
+            if cursor_fingerprint != fingerprint:
+                raise ValueError("Cursor belongs to a different query")
+            snapshot = self.cursor_cache.pop(snapshot_id) if snapshot_id else None
+            if snapshot is not None and snapshot["query"] == fingerprint:
+                heap = snapshot["heap"]
+                result = self._page_from_heap(heap, query.limit, fingerprint, snapshot["complete"])
+                if explain:
+                    result["plan"] = {"cursor": "snapshot", "remaining": len(heap)}
+                return result
+        
+        # Fuzzy-match ingredients and cuisine once; the scores feed both filtering and ranking
+        ingredient_scores = [dict(self.ingredient_matcher.within(ing, 0.6)) for ing in query.ingredients]
+        cuisine_scores = dict(self.cuisine_matcher.within(query.cuisine, 0.6)) if query.cuisine else {}
         
-        # Sort by score and return top 5
-        return sorted(scored_recipes, key=lambda x: x["score"], reverse=True)[:5]
+        predicates = [
+            IndexPredicate(f"ingredient~{ingredient}",
+                           [self.recipe_index['ingredients'][name] for name in scores])
+            for ingredient, scores in zip(query.ingredients, ingredient_scores)
+        ]
+        if query.cuisine:
+            predicates.append(IndexPredicate(f"cuisine~{query.cuisine}",
+                                             [self.recipe_index['cuisine_types'][name] for name in cuisine_scores]))
+        if query.difficulty:
+            predicates.append(IndexPredicate(f"difficulty={query.difficulty}",
+                                             [self.recipe_index['difficulty_levels'].get(query.difficulty.lower(), set())]))
+        predicates += category_predicates(spice_level=query.spice_level, cooking_method=query.cooking_method,
+                                          dietary_restriction=query.dietary_restriction, diet=query.diet,
+                                          region=query.region)
+        predicates += range_predicates(max_time=query.max_time, min_servings=query.min_servings,
+                                       max_total_time=query.max_total_time)
+        
+        matching, plan = self.query_planner.execute(predicates, self.recipes, explain=explain)
+        score = self._score_catalog(ingredient_scores, cuisine_scores)
+        
+        # Heap entries sort by descending score, then catalog order. Heapify is O(n)
+        # and each page pops only `limit` entries, so nothing is fully sorted
+        rows = self.recipe_matrix.rows
+        # Recipes added since this manager's last refresh_catalog() are not ranked yet
+        heap = [(-float(score[rows[recipe_id]]), rows[recipe_id]) for recipe_id in matching if recipe_id in rows]
+        if after is not None:
+            # Snapshot expired or served by another process: resume after the cursor position
+            heap = [entry for entry in heap if entry > after]
+        heapq.heapify(heap)
+        
+        result = self._page_from_heap(heap, query.limit, fingerprint)
+        if explain:
+            result["plan"] = plan
+        return result
 
-    def _calculate_recipe_score(self, recipe: Dict[str, Any], ingredients: List[str] = None, cuisine: str = None) -> float:
-        """Calculate recipe match score based on multiple factors"""
-        score = 50.0  # Base score
+    def _score_catalog(self, ingredient_scores: List[Dict[str, float]],
+                       cuisine_scores: Dict[str, float]) -> np.ndarray:
+        """Suggestion score of every recipe in the catalog, computed with array operations"""
+        matrix = self.recipe_matrix
+        score = np.full(len(matrix), 50.0)  # Base score
         
-        if ingredients:
-            matching_ingredients = sum(
-                max(self._fuzzy_match_score(ing, recipe_ing["name"])
-                    for recipe_ing in recipe["ingredients"])
-                for ing in ingredients
-            )
-            score += (matching_ingredients / len(ingredients)) * 30
+        if ingredient_scores:
+            # Candidates contain a close match for every requested ingredient, so
+            # ingredients scoring at or below the threshold never affect the ranking
+            matched_ingredients = np.zeros(len(matrix))
+            for scores in ingredient_scores:
+                matched_ingredients += matrix.best_ingredient_scores(scores)
+            score += (matched_ingredients / len(ingredient_scores)) * 30
         
-        if cuisine and self._fuzzy_match_score(cuisine, recipe["cuisine_type"]) > 0.6:
-            score += 20
-            
-        # Adjust score based on difficulty
-        difficulty_weights = {"easy": 1.1, "medium": 1.0, "hard": 0.9}
-        score *= difficulty_weights.get(recipe["difficulty_level"].lower(), 1.0)
+        if cuisine_scores:
+            score += matrix.cuisine_mask(cuisine_scores, 0.6) * 20
         
+        # Adjust score based on difficulty
+        score *= matrix.difficulty_weights
         return score
 
+    def _page_from_heap(self, heap: List[Tuple[float, int]], limit: int, fingerprint: str,
+                        complete: bool = True) -> Dict[str, Any]:
+        """Pop the next `limit` suggestions, saving the next few pages behind a cursor
+
+        `complete` is False when the heap holds only the start of the remaining
+        ranking, so the cursor must resume by re-running the query once it runs out.
+        """
+        page = [heapq.heappop(heap) for _ in range(min(limit, len(heap)))]
+        
+        suggestions = []
+        for neg_score, row in page:
+            recipe = self.recipes[self.recipe_matrix.recipe_ids[row]]
+            suggestions.append({
+                "name": recipe["name"],
+                "score": -neg_score,
+                "cuisine": recipe["cuisine_type"],
+                "description": recipe["description"],
+                "difficulty": recipe["difficulty_level"],
+                "time": recipe["preparation_time"]
+            })
+        
+        next_cursor = None
+        if page and (heap or not complete):
+            snapshot_id = None
+            if heap:
+                saved = max(1, CURSOR_SNAPSHOT_PAGES) * limit
+                # A sorted list is a valid heap, so the saved pages pop in order
+                snapshot_id = secrets.token_urlsafe(8)
+                self.cursor_cache.set(snapshot_id, {
+                    "query": fingerprint,
+                    "heap": heapq.nsmallest(saved, heap),
+                    "complete": complete and len(heap) <= saved
+                })
+            next_cursor = self._encode_cursor(snapshot_id, page[-1], fingerprint)
+        return {"suggestions": suggestions, "next_cursor": next_cursor}
+
+    @staticmethod
+    def _encode_cursor(snapshot_id: Optional[str], last_entry: Tuple[float, int], fingerprint: str) -> str:
+        payload = json.dumps({"id": snapshot_id, "after": list(last_entry), "query": fingerprint})
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[Optional[str], Tuple[float, int], str]:
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            neg_score, row = payload["after"]
+            snapshot_id = payload["id"]
+            return (str(snapshot_id) if snapshot_id else None, (float(neg_score), int(row)),
+                    str(payload["query"]))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise ValueError("Invalid cursor") from e
+
 class VoiceCookingAssistant:
     def __init__(self):
         # Initialize speech recognition with error recovery
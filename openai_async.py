@@ -0,0 +1,157 @@
+"""
+Async OpenAI access for request handlers. Chat completions run on one
+background event loop, and each request carries a total deadline that
+covers every attempt and backoff, so a slow upstream cannot hold a Flask
+worker thread past its budget.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, InternalServerError, RateLimitError
+
+logger = logging.getLogger(__name__)
+
+# Point the clients at another OpenAI-compatible server, e.g. a local fake for tests
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None
+# Total time a web request may spend on extraction, retries and generation
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_SECONDS', 8))
+# Streamed requests show progress as they go, so they may run longer
+STREAM_DEADLINE_SECONDS = float(os.getenv('STREAM_DEADLINE_SECONDS', 30))
+
+# Failures worth another attempt; anything else (bad key, bad request) is final
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError, RateLimitError)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out before the call finished"""
+
+
+class Deadline:
+    """A point in time by which a request must finish
+
+    Cancelling a deadline ends it at once and cancels the work registered
+    with on_cancel, such as an in-flight OpenAI call.
+    """
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+        self.cancelled = False
+        self.lock = threading.Lock()
+        self._callbacks = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def on_cancel(self, callback: Callable[[], Any]):
+        """Call callback when the deadline is cancelled (at once if it already was)"""
+        with self.lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        with self.lock:
+            self.expires_at = min(self.expires_at, time.monotonic())
+            self.cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+class SharedDeadline(Deadline):
+    """Deadline of one call that several requests wait on
+
+    Each request joins with its own deadline, and the shared deadline is
+    cancelled only once every request that joined has cancelled its own, so
+    one request giving up does not abort the call for the others. A request
+    joining without a deadline never gives up.
+    """
+
+    def __init__(self, seconds: float):
+        super().__init__(seconds)
+        self.waiters = 0
+
+    def join(self, deadline: Optional[Deadline]):
+        with self.lock:
+            self.waiters += 1
+        if deadline is not None:
+            deadline.on_cancel(self._leave)
+
+    def _leave(self):
+        with self.lock:
+            self.waiters -= 1
+            last = self.waiters == 0
+        if last:
+            self.cancel()
+
+
+class AsyncOpenAIRunner:
+    """Runs AsyncOpenAI chat completions on a background event loop thread
+
+    Blocking callers wait at most until their deadline; when it passes, the
+    in-flight attempt and any pending retries are cancelled on the loop.
+    """
+
+    def __init__(self, api_key: Optional[str], base_url: Optional[str] = OPENAI_BASE_URL,
+                 attempts: int = 3, backoff: float = 0.5):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.attempts = attempts
+        self.backoff = backoff
+        self.lock = threading.Lock()
+        self.loop = None
+        self.client = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self.lock:
+            if self.loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="openai-async", daemon=True).start()
+                # The client's connection pool belongs to the loop it first runs on
+                self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+                self.loop = loop
+            return self.loop
+
+    async def _complete(self, deadline: Deadline, request: dict) -> str:
+        delay = self.backoff
+        for attempt in range(1, self.attempts + 1):
+            remaining = deadline.remaining()
+            if remaining <= 0:
+                raise DeadlineExceeded("deadline passed before the OpenAI call")
+            try:
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(timeout=remaining, **request), remaining
+                )
+                return response.choices[0].message.content
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("OpenAI call did not finish within the deadline")
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.attempts or deadline.remaining() <= delay:
+                    raise
+                logger.warning(f"OpenAI attempt {attempt} failed ({e}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay *= 2
+
+    def complete(self, deadline: Deadline, **request: Any) -> str:
+        """Message content of a chat completion, finished within the deadline or cancelled"""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._complete(deadline, request), loop)
+        # Cancelling the future cancels the task on the loop, aborting the HTTP request
+        deadline.on_cancel(future.cancel)
+        try:
+            return future.result(timeout=deadline.remaining())
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise DeadlineExceeded("OpenAI call did not finish within the deadline")
+        except concurrent.futures.CancelledError:
+            raise DeadlineExceeded("OpenAI call was cancelled")
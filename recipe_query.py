@@ -0,0 +1,202 @@
+"""
+Structured recipe queries and a small cost-based planner that evaluates
+their filters most-selective-first against the in-memory indexes.
+"""
+
+import hashlib
+import json
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Largest page a search may ask for
+MAX_LIMIT = 50
+
+
+def _optional_int(value: Any, field_name: str) -> Optional[int]:
+    """Parse an optional numeric request field; blank values mean no filter"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{field_name} must be a number")
+    try:
+        return int(value)
+    except (ValueError, OverflowError) as e:
+        raise ValueError(f"{field_name} must be a number") from e
+
+
+def _optional_str(value: Any, field_name: str) -> Optional[str]:
+    """Parse an optional text request field; blank values mean no filter"""
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{field_name} must be a string")
+    return value
+
+
+def _string_list(value: Any, field_name: str) -> List[str]:
+    """Parse an optional list of names, dropping blank ones"""
+    if value is None or value == '':
+        return []
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"{field_name} must be a list of strings")
+    return [item for item in value if item]
+
+
+@dataclass
+class RecipeQuery:
+    """Multi-criteria recipe search request shared by RecipeManager and the web API"""
+    ingredients: List[str] = field(default_factory=list)
+    cuisine: Optional[str] = None
+    difficulty: Optional[str] = None
+    spice_level: Optional[str] = None
+    cooking_method: Optional[str] = None
+    dietary_restriction: Optional[str] = None
+    diet: Optional[str] = None
+    region: Optional[str] = None
+    max_time: Optional[int] = None
+    min_servings: Optional[int] = None
+    max_total_time: Optional[int] = None
+    limit: int = 5
+    cursor: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RecipeQuery":
+        """Build a query from a JSON request body, ignoring unknown or empty fields
+
+        Raises ValueError for a field of the wrong type; limit is clamped to 1..MAX_LIMIT.
+        """
+        data = data or {}
+        if not isinstance(data, dict):
+            raise ValueError("Query must be a JSON object")
+        limit = _optional_int(data.get('limit'), 'limit')
+        return cls(
+            ingredients=_string_list(data.get('ingredients'), 'ingredients'),
+            cuisine=_optional_str(data.get('cuisine') or data.get('cuisine_type'), 'cuisine'),
+            difficulty=_optional_str(data.get('difficulty'), 'difficulty'),
+            spice_level=_optional_str(data.get('spice_level'), 'spice_level'),
+            cooking_method=_optional_str(data.get('cooking_method'), 'cooking_method'),
+            dietary_restriction=_optional_str(data.get('dietary_restriction'), 'dietary_restriction'),
+            diet=_optional_str(data.get('diet'), 'diet'),
+            region=_optional_str(data.get('region'), 'region'),
+            max_time=_optional_int(data.get('max_time'), 'max_time'),
+            min_servings=_optional_int(data.get('min_servings'), 'min_servings'),
+            max_total_time=_optional_int(data.get('max_total_time'), 'max_total_time'),
+            limit=min(max(limit, 1), MAX_LIMIT) if limit is not None else 5,
+            cursor=_optional_str(data.get('cursor'), 'cursor')
+        )
+
+    def fingerprint(self) -> str:
+        """Short digest of the filters, so a cursor can only continue the query that made it"""
+        filters = asdict(self)
+        del filters['limit'], filters['cursor']
+        return hashlib.sha1(json.dumps(filters, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class Predicate(ABC):
+    """A filter over recipe IDs that the planner can estimate, materialize or apply"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @abstractmethod
+    def estimate(self) -> int:
+        """Upper bound on the number of recipes this predicate matches"""
+
+    @abstractmethod
+    def materialize(self) -> Set[str]:
+        """All recipe IDs matching this predicate"""
+
+    def filter(self, candidates: Set[str]) -> Set[str]:
+        """Subset of candidates matching this predicate"""
+        return candidates & self.materialize()
+
+
+class IndexPredicate(Predicate):
+    """Matches recipes found in any of a list of posting sets from an inverted index"""
+
+    def __init__(self, name: str, postings: Iterable[Set[str]]):
+        super().__init__(name)
+        self.postings = [posting for posting in postings if posting]
+
+    def estimate(self) -> int:
+        return sum(len(posting) for posting in self.postings)
+
+    def materialize(self) -> Set[str]:
+        if len(self.postings) == 1:
+            return self.postings[0]
+        return set().union(*self.postings)
+
+    def filter(self, candidates: Set[str]) -> Set[str]:
+        # Probing each posting avoids building the union when candidates are few
+        if len(self.postings) == 1:
+            return candidates & self.postings[0]
+        return {recipe_id for recipe_id in candidates
+                if any(recipe_id in posting for posting in self.postings)}
+
+
+class RangePredicate(Predicate):
+    """Matches recipes whose indexed numeric field lies in [low, high]"""
+
+    def __init__(self, name: str, index: Any, low: Optional[float] = None, high: Optional[float] = None):
+        super().__init__(name)
+        self.index = index
+        self.low = low
+        self.high = high
+
+    def estimate(self) -> int:
+        return self.index.count(self.low, self.high)
+
+    def materialize(self) -> Set[str]:
+        return set(self.index.between(self.low, self.high))
+
+    def filter(self, candidates: Set[str]) -> Set[str]:
+        return {recipe_id for recipe_id in candidates if self.index.contains(recipe_id, self.low, self.high)}
+
+
+class QueryPlanner:
+    """Orders predicates by estimated cardinality and intersects them, smallest first"""
+
+    def plan(self, predicates: List[Predicate]) -> List[Tuple[Predicate, int]]:
+        """Predicates paired with their estimates, cheapest (most selective) first"""
+        estimated = [(predicate, predicate.estimate()) for predicate in predicates]
+        return sorted(estimated, key=lambda item: item[1])
+
+    def execute(self, predicates: List[Predicate], universe: Iterable[str],
+                explain: bool = False) -> Tuple[Set[str], Optional[Dict[str, Any]]]:
+        """Evaluate predicates as a conjunction; returns matching IDs and an optional plan report"""
+        start = time.perf_counter()
+        plan = self.plan(predicates)
+        steps = []
+
+        if not plan:
+            candidates = set(universe)
+        else:
+            candidates = None
+            for position, (predicate, estimate) in enumerate(plan):
+                step_start = time.perf_counter()
+                if candidates is None:
+                    candidates = set(predicate.materialize())
+                else:
+                    candidates = predicate.filter(candidates)
+                steps.append({
+                    "predicate": predicate.name,
+                    "estimate": estimate,
+                    "remaining": len(candidates),
+                    "ms": round((time.perf_counter() - step_start) * 1000, 3)
+                })
+                if not candidates:
+                    # Nothing left to filter; later predicates cannot add matches
+                    steps.extend({"predicate": skipped.name, "estimate": skipped_estimate, "skipped": True}
+                                 for skipped, skipped_estimate in plan[position + 1:])
+                    break
+
+        if not explain:
+            return candidates, None
+        return candidates, {
+            "steps": steps,
+            "matched": len(candidates),
+            "ms": round((time.perf_counter() - start) * 1000, 3)
+        }
@@ -0,0 +1,280 @@
+"""
+Schema for generated recipes: the shape of an `INDIAN_RECIPES` entry, a
+validator that normalizes model output into that shape, and a repair pass
+for JSON that is fenced, wrapped in prose, has trailing commas or was cut
+off by the token limit.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# JSON schema of a catalog entry; also sent to the model as the required output shape
+RECIPE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "cuisine_type": {"type": "string"},
+        "preparation_time": {"type": "integer", "description": "total minutes"},
+        "description": {"type": "string"},
+        "difficulty_level": {"type": "string", "enum": ["Easy", "Medium", "Hard"]},
+        "serving_size": {"type": "integer"},
+        "ingredients": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "quantity": {"type": "number"},
+                    "unit": {"type": "string"}
+                },
+                "required": ["name", "quantity", "unit"]
+            }
+        },
+        "steps": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "step": {"type": "string"},
+                    "time": {"type": "integer", "description": "minutes"}
+                },
+                "required": ["step", "time"]
+            }
+        }
+    },
+    "required": ["name", "cuisine_type", "preparation_time", "description", "difficulty_level",
+                 "serving_size", "ingredients", "steps"]
+}
+
+DIFFICULTY_LEVELS = ("Easy", "Medium", "Hard")
+# The catalog's most common serving size, for output that leaves it out
+DEFAULT_SERVING_SIZE = 4
+# Quantity of an ingredient given without a number, such as "salt to taste"
+DEFAULT_QUANTITY = 1
+# How many times repair may drop a trailing element of cut-off output
+MAX_REPAIR_CUTS = 8
+
+NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?(?:/\d+)?')
+# "2 cups rice", "1/2 teaspoon of salt": a quantity and unit ahead of the ingredient name
+INGREDIENT_PATTERN = re.compile(
+    r'^\s*(\d+(?:\.\d+)?(?:/\d+)?)\s*'
+    r'(grams?|g|kg|ml|l|cups?|tablespoons?|tbsp|teaspoons?|tsp|pieces?|cloves?|sprigs?|leaves|'
+    r'inch(?:es)?|pinch(?:es)?|large|medium|small|whole|bunch|stalks?)?\.?\s+(?:of\s+)?(.+)$',
+    re.IGNORECASE
+)
+# "salt to taste", "oil (as needed)": a measure in words after the ingredient name
+DESCRIPTIVE_MEASURE = re.compile(
+    r'[\s,(]+(to taste|as (?:needed|required)|for (?:garnish(?:ing)?|frying|serving)|optional)\)?\s*$',
+    re.IGNORECASE
+)
+
+
+class RecipeValidationError(ValueError):
+    """Model output that cannot be turned into a usable recipe"""
+
+
+def _scan(text: str) -> Tuple[str, List[int], bool]:
+    """Balance JSON text: the first object with trailing commas removed and open strings,
+    objects and arrays closed, the comma positions where it may be cut back, and whether
+    it ended inside a string
+    """
+    out = []
+    stack = []
+    commas = []
+    in_string = escaped = False
+    for i, c in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == '\\':
+                escaped = True
+            elif c == '"':
+                in_string = False
+            out.append(c)
+            continue
+        if c == '"':
+            in_string = True
+        elif c in '{[':
+            stack.append('}' if c == '{' else ']')
+        elif c in '}]':
+            # A comma directly before a closer is dropped
+            while out and (out[-1].isspace() or out[-1] == ','):
+                out.pop()
+            if not stack:
+                break
+            stack.pop()
+            out.append(c)
+            if not stack:
+                # Anything after the object, such as a closing fence, is ignored
+                return ''.join(out), commas, False
+            continue
+        elif c == ',':
+            commas.append(i)
+        out.append(c)
+
+    truncated_string = in_string
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    while out and (out[-1].isspace() or out[-1] == ','):
+        out.pop()
+    out.extend(reversed(stack))
+    return ''.join(out), commas, truncated_string
+
+
+def repair_json(text: str) -> Optional[Any]:
+    """Parse the JSON object in model output, repairing it if it is slightly malformed or truncated
+
+    A string cut off mid-way is dropped together with the element it belongs
+    to rather than kept half-written. Returns None if nothing usable is left.
+    """
+    start = text.find('{')
+    if start < 0:
+        return None
+    text = text[start:]
+    for attempt in range(MAX_REPAIR_CUTS + 1):
+        candidate, commas, truncated_string = _scan(text)
+        if not (truncated_string and attempt == 0 and commas):
+            try:
+                return json.loads(candidate)
+            except json.JSONDecodeError:
+                pass
+        if not commas:
+            return None
+        # Drop the last, incomplete element and try again
+        text = text[:commas[-1]]
+    return None
+
+
+def _number(value: Any) -> Optional[float]:
+    """A number from a number or a string such as "30 minutes" or "1/2"; None if there is none"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        match = NUMBER_PATTERN.search(value)
+        if match:
+            numerator, _, denominator = match.group(0).partition('/')
+            number = float(numerator) / float(denominator) if denominator and float(denominator) else float(numerator)
+            return int(number) if number.is_integer() else number
+    return None
+
+
+def _text(value: Any) -> str:
+    return value.strip() if isinstance(value, str) else ''
+
+
+def _split_measure(name: str) -> Tuple[str, str]:
+    """An ingredient name without a trailing measure in words, and that measure"""
+    match = DESCRIPTIVE_MEASURE.search(name)
+    if not match or not name[:match.start()].strip():
+        return name.strip(), ''
+    return name[:match.start()].strip(), match.group(1).lower()
+
+
+def normalize_ingredient(item: Any) -> Optional[Dict[str, Any]]:
+    """An ingredient as {"name", "quantity", "unit"} with a numeric quantity; None if unusable"""
+    if isinstance(item, str):
+        match = INGREDIENT_PATTERN.match(item)
+        if match:
+            name, measure = _split_measure(match.group(3))
+            return {"name": name, "quantity": _number(match.group(1)),
+                    "unit": (match.group(2) or measure).lower()}
+        name, measure = _split_measure(item)
+        return {"name": name, "quantity": DEFAULT_QUANTITY, "unit": measure} if name else None
+    if not isinstance(item, dict):
+        return None
+    name, measure = _split_measure(_text(item.get("name") or item.get("ingredient") or item.get("item")))
+    if not name:
+        return None
+    quantity = item.get("quantity", item.get("amount", ''))
+    unit = _text(item.get("unit"))
+    number = _number(quantity)
+    if number is None:
+        # "to taste" given as the quantity
+        return {"name": name, "quantity": DEFAULT_QUANTITY, "unit": unit or _text(quantity).lower() or measure}
+    if isinstance(quantity, str) and not unit:
+        # "2 cups" given as the quantity
+        unit = NUMBER_PATTERN.sub('', quantity, count=1).strip()
+    return {"name": name, "quantity": number, "unit": unit or measure}
+
+
+def normalize_step(item: Any) -> Optional[Dict[str, Any]]:
+    """A step as {"step", "time"} with whole minutes; None if unusable"""
+    if isinstance(item, str):
+        return {"step": item.strip(), "time": 0} if item.strip() else None
+    if not isinstance(item, dict):
+        return None
+    text = _text(item.get("step") or item.get("instruction") or item.get("description") or item.get("text"))
+    if not text:
+        return None
+    time = _number(item.get("time", item.get("duration")))
+    return {"step": text, "time": int(time) if time else 0}
+
+
+def normalize_piece(event: str, data: Any) -> Optional[Tuple[str, Any]]:
+    """A streamed ("ingredient" or "step", item) piece normalized as validate_recipe would; None if unusable
+
+    Other pieces are returned unchanged.
+    """
+    normalize = {"ingredient": normalize_ingredient, "step": normalize_step}.get(event)
+    if normalize is None:
+        return event, data
+    data = normalize(data)
+    return (event, data) if data is not None else None
+
+
+def validate_recipe(data: Any, fallback_name: str = None) -> Dict[str, Any]:
+    """Normalize a generated recipe to the catalog entry shape, or raise RecipeValidationError
+
+    Ingredients and steps given as plain strings, numbers written as text and
+    missing optional fields are fixed up; a recipe without a name, ingredients
+    or steps is rejected.
+    """
+    if isinstance(data, dict) and len(data) == 1 and isinstance(next(iter(data.values())), dict):
+        # {"recipe": {...}}
+        data = next(iter(data.values()))
+    if not isinstance(data, dict):
+        raise RecipeValidationError("recipe is not a JSON object")
+
+    name = _text(data.get("name")) or _text(fallback_name)
+    if not name:
+        raise RecipeValidationError("recipe has no name")
+    if not isinstance(data.get("ingredients"), list) or not isinstance(data.get("steps"), list):
+        raise RecipeValidationError("recipe needs ingredient and step lists")
+    ingredients = [ingredient for ingredient in map(normalize_ingredient, data["ingredients"]) if ingredient]
+    steps = [step for step in map(normalize_step, data["steps"]) if step]
+    if not ingredients:
+        raise RecipeValidationError("recipe has no usable ingredients")
+    if not steps:
+        raise RecipeValidationError("recipe has no usable steps")
+
+    preparation_time = _number(data.get("preparation_time"))
+    serving_size = _number(data.get("serving_size"))
+    difficulty = _text(data.get("difficulty_level")).capitalize()
+    return {
+        "name": name,
+        "cuisine_type": _text(data.get("cuisine_type")) or "International",
+        "preparation_time": int(preparation_time) if preparation_time else sum(step["time"] for step in steps),
+        "description": _text(data.get("description")),
+        "difficulty_level": difficulty if difficulty in DIFFICULTY_LEVELS else "Medium",
+        "serving_size": int(serving_size) if serving_size else DEFAULT_SERVING_SIZE,
+        "ingredients": ingredients,
+        "steps": steps
+    }
+
+
+def parse_recipe(content: str, fallback_name: str = None) -> Dict[str, Any]:
+    """Parse, repair if needed, and validate a model response; raise RecipeValidationError if unusable"""
+    try:
+        data = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        data = repair_json(content or '')
+        if data is None:
+            raise RecipeValidationError("response is not repairable JSON")
+    return validate_recipe(data, fallback_name)
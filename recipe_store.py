@@ -0,0 +1,91 @@
+"""
+Persistent recipe store: generated recipes promoted into the local catalog
+are written to the `recipes` table from models.py and loaded back at
+startup, so they survive restarts without another OpenAI call.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker
+
+from models import Ingredient, Recipe, engine, recipe_ingredients
+from recipe_schema import DEFAULT_QUANTITY
+
+logger = logging.getLogger(__name__)
+
+
+class RecipeStore:
+    """Reads and writes catalog-shaped recipe dicts through the SQLAlchemy models"""
+
+    def __init__(self, bind=engine):
+        self.Session = sessionmaker(bind=bind)
+
+    def save(self, recipe: Dict[str, Any]) -> bool:
+        """Insert a recipe with its ingredients and quantities; False if the write failed"""
+        try:
+            with self.Session() as session, session.begin():
+                row = Recipe(
+                    name=recipe["name"],
+                    cuisine_type=recipe["cuisine_type"],
+                    preparation_time=recipe["preparation_time"],
+                    cooking_steps=json.dumps(recipe["steps"]),
+                    description=recipe["description"],
+                    difficulty_level=recipe["difficulty_level"],
+                    serving_size=recipe["serving_size"]
+                )
+                session.add(row)
+                for item in recipe["ingredients"]:
+                    ingredient = session.scalars(select(Ingredient).filter_by(name=item["name"])).first()
+                    if ingredient is None:
+                        ingredient = Ingredient(name=item["name"])
+                        session.add(ingredient)
+                    session.flush()
+                    quantity = item["quantity"]
+                    session.execute(recipe_ingredients.insert().values(
+                        recipe_id=row.id,
+                        ingredient_id=ingredient.id,
+                        # Recipes promoted before quantities were always numeric may lack one
+                        required_quantity=quantity if isinstance(quantity, (int, float)) else None,
+                        required_unit=item["unit"]
+                    ))
+            return True
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to store recipe '{recipe.get('name')}': {e}")
+            return False
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        """Every stored recipe in the catalog entry shape, oldest first"""
+        try:
+            with self.Session() as session:
+                recipes = session.scalars(select(Recipe).order_by(Recipe.id)).all()
+                rows = session.execute(
+                    select(recipe_ingredients.c.recipe_id, Ingredient.name,
+                           recipe_ingredients.c.required_quantity, recipe_ingredients.c.required_unit)
+                    .join(Ingredient, Ingredient.id == recipe_ingredients.c.ingredient_id)
+                ).all()
+                ingredients = {}
+                for recipe_id, name, quantity, unit in rows:
+                    if quantity is not None and float(quantity).is_integer():
+                        quantity = int(quantity)
+                    ingredients.setdefault(recipe_id, []).append({
+                        "name": name,
+                        "quantity": quantity if quantity is not None else DEFAULT_QUANTITY,
+                        "unit": unit or ''
+                    })
+                return [{
+                    "name": recipe.name,
+                    "cuisine_type": recipe.cuisine_type,
+                    "preparation_time": recipe.preparation_time,
+                    "description": recipe.description or '',
+                    "difficulty_level": recipe.difficulty_level,
+                    "serving_size": recipe.serving_size,
+                    "ingredients": ingredients.get(recipe.id, []),
+                    "steps": json.loads(recipe.cooking_steps or '[]')
+                } for recipe in recipes]
+        except (SQLAlchemyError, ValueError) as e:
+            logger.error(f"Failed to load stored recipes: {e}")
+            return []
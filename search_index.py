@@ -0,0 +1,638 @@
+"""
+In-memory index structures used to search the recipe catalog without
+scanning every recipe on each query.
+"""
+
+import bisect
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+def normalize_key(text: str) -> str:
+    """Lowercase and collapse whitespace so index keys compare consistently"""
+    return ' '.join(text.lower().split())
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of a normalized string, padded at word boundaries"""
+    padded = f"  {normalize_key(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Words that carry no meaning for recipe text search, including request phrasing
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "with", "in", "on", "for", "to", "into", "from", "until",
+    "some", "something", "anything", "dish", "recipe", "recipes", "make", "cook", "how", "do", "i",
+    "me", "my", "want", "can", "you", "show", "please", "like", "would", "is", "it", "that", "this",
+    "prepare", "help", "tell", "teach", "hey", "um", "uh",
+}
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed and plurals folded"""
+    tokens = []
+    for word in _WORD_PATTERN.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class TrigramIndex:
+    """Character trigram index mapping name strings to the values they identify"""
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.values: List[Any] = []
+        self.gram_counts: List[int] = []
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self._key_ids: Dict[Tuple[str, Any], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: str, value: Any):
+        """Index a name (or alias) for a value; duplicate pairs are ignored"""
+        key = normalize_key(key)
+        if not key or (key, value) in self._key_ids:
+            return
+        key_id = len(self.keys)
+        self.keys.append(key)
+        self.values.append(value)
+        self._key_ids[(key, value)] = key_id
+        grams = trigrams(key)
+        self.gram_counts.append(len(grams))
+        for gram in grams:
+            self.postings[gram].append(key_id)
+
+    def candidates(self, query: str, limit: Optional[int] = 50) -> List[Tuple[str, Any]]:
+        """Return up to `limit` (key, value) pairs sharing the most trigrams with query"""
+        grams = trigrams(query)
+        if not grams:
+            return []
+
+        overlap = Counter()
+        for gram in grams:
+            overlap.update(self.postings.get(gram, ()))
+
+        if limit is None:
+            return [(self.keys[key_id], self.values[key_id]) for key_id in sorted(overlap)]
+
+        # Rank by Dice coefficient so long keys don't win just by containing more trigrams
+        query_size = len(grams)
+        ranked = heapq.nlargest(
+            limit,
+            overlap.items(),
+            key=lambda item: (2 * item[1] / (query_size + self.gram_counts[item[0]]), -item[0])
+        )
+        return [(self.keys[key_id], self.values[key_id]) for key_id, _ in ranked]
+
+
+def _char_masks(text: str) -> Dict[str, int]:
+    """Bitmask of the positions of each character, for bit-parallel LCS"""
+    masks: Dict[str, int] = {}
+    for position, char in enumerate(text):
+        masks[char] = masks.get(char, 0) | (1 << position)
+    return masks
+
+
+def _lcs_length(masks: Dict[str, int], length: int, other: str) -> int:
+    """Longest common subsequence length using the Allison-Dix bit-parallel recurrence"""
+    full = (1 << length) - 1
+    row = full
+    for char in other:
+        matches = row & masks.get(char, 0)
+        row = ((row + matches) | (row - matches)) & full
+    return length - bin(row).count('1')
+
+
+def bounded_edit_distance(str1: str, str2: str, max_distance: int) -> int:
+    """Insert/delete edit distance, or max_distance + 1 when it exceeds max_distance
+
+    Substitutions count as a delete plus an insert, so the distance is
+    len1 + len2 - 2 * LCS and the similarity derived from it is an upper
+    bound on difflib's ratio(). The length difference alone rules out most
+    far-away pairs before any character comparison happens.
+    """
+    if abs(len(str1) - len(str2)) > max_distance:
+        return max_distance + 1
+    if not str1 or not str2:
+        return len(str1) + len(str2)
+    distance = len(str1) + len(str2) - 2 * _lcs_length(_char_masks(str1), len(str1), str2)
+    return distance if distance <= max_distance else max_distance + 1
+
+
+def edit_similarity(str1: str, str2: str, threshold: float = 0.0) -> float:
+    """Similarity in [0, 1] from edit distance; returns 0.0 once it cannot exceed threshold"""
+    total = len(str1) + len(str2)
+    if not total:
+        return 1.0
+    max_distance = int((1 - threshold) * total)
+    distance = bounded_edit_distance(str1, str2, max_distance)
+    if distance > max_distance:
+        return 0.0
+    return 1 - distance / total
+
+
+def sequence_similarity(str1: str, str2: str, threshold: float = 0.0) -> float:
+    """difflib's ratio() for the pair, or 0.0 when it cannot exceed threshold
+
+    Edit similarity bounds ratio() from above, so pairs it rules out never
+    reach SequenceMatcher, while scores and thresholds keep difflib's meaning.
+    """
+    if edit_similarity(str1, str2, threshold) <= threshold:
+        return 0.0
+    return SequenceMatcher(None, str1, str2).ratio()
+
+
+def _search_radius(query: str, threshold: float) -> int:
+    """Largest edit distance at which a key could still score above threshold"""
+    if threshold <= 0:
+        return float('inf')
+    # d < (1 - t) * (len(q) + len(k)) and len(k) <= len(q) + d imply d < 2 * (1 - t) / t * len(q)
+    return int(2 * (1 - threshold) / threshold * len(query))
+
+
+class BKTree:
+    """Burkhard-Keller tree answering bounded edit-distance queries over a set of keys"""
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self.root: Optional[list] = None
+        self.size = 0
+        for key in keys:
+            self.add(key)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, key: str):
+        """Insert a key; each node is [key, {distance: child}]"""
+        if self.root is None:
+            self.root = [key, {}]
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            distance = bounded_edit_distance(key, node[0], len(key) + len(node[0]))
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [key, {}]
+                self.size += 1
+                return
+            node = child
+
+    def _walk(self, query: str, max_distance, on_match):
+        """Visit nodes that can hold keys within max_distance of query
+
+        `on_match(distance, key)` is called for every key in range and returns
+        the (possibly tightened) radius for the rest of the walk.
+        """
+        stack = [self.root] if self.root is not None else []
+        masks = _char_masks(query)
+        while stack:
+            key, children = stack.pop()
+            distance = len(query) + len(key) - 2 * _lcs_length(masks, len(query), key)
+            if distance <= max_distance:
+                max_distance = on_match(distance, key)
+            # Triangle inequality: only subtrees at distance d +/- max_distance can match
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+
+    def search(self, query: str, max_distance) -> List[Tuple[int, str]]:
+        """All (distance, key) pairs with distance <= max_distance, closest first"""
+        results = []
+
+        def collect(distance, key):
+            results.append((distance, key))
+            return max_distance
+
+        self._walk(query, max_distance, collect)
+        results.sort()
+        return results
+
+    def best(self, query: str, max_distance) -> Optional[Tuple[int, str]]:
+        """Closest key within max_distance, shrinking the radius as better keys are found"""
+        best = None
+
+        def keep_closest(distance, key):
+            nonlocal best
+            if best is None or (distance, key) < best:
+                best = (distance, key)
+            return best[0]
+
+        self._walk(query, max_distance, keep_closest)
+        return best
+
+
+class FuzzyMatcher:
+    """Fuzzy lookup over a fixed vocabulary (recipe names, ingredients, cuisines)"""
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self.tree = BKTree()
+        self.substrings = TrigramIndex()
+        self.keys: Set[str] = set()
+        for key in keys:
+            self.add(key)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: str):
+        key = normalize_key(key)
+        if key and key not in self.keys:
+            self.keys.add(key)
+            self.tree.add(key)
+            self.substrings.add(key, key)
+
+    def _candidates(self, query: str, threshold: float) -> Iterable[str]:
+        """Keys whose edit similarity exceeds threshold: a superset of those whose ratio() does"""
+        for distance, key in self.tree.search(query, _search_radius(query, threshold)):
+            if 1 - distance / (len(query) + len(key)) > threshold:
+                yield key
+
+    def within(self, query: str, threshold: float = 0.6, containment: bool = False) -> List[Tuple[str, float]]:
+        """Keys whose difflib ratio() against query exceeds threshold, best first
+
+        The BK-tree narrows the vocabulary to the few keys close enough in
+        edit distance, and only those are scored with SequenceMatcher. With
+        containment=True, keys that contain (or are contained in) the query
+        also match, mirroring the substring rule in `similar()`.
+        """
+        query = normalize_key(query)
+        if not query:
+            return []
+        matches = {}
+        for key in self._candidates(query, threshold):
+            score = SequenceMatcher(None, query, key).ratio()
+            if score > threshold:
+                matches[key] = score
+        if containment:
+            for key, _ in self.substrings.candidates(query, limit=None):
+                if key not in matches and (query in key or key in query):
+                    matches[key] = SequenceMatcher(None, query, key).ratio()
+        return sorted(matches.items(), key=lambda item: (-item[1], item[0]))
+
+    def best(self, query: str, threshold: float = 0.6) -> Optional[Tuple[str, float]]:
+        """Key with the highest ratio() above threshold, or None"""
+        query = normalize_key(query)
+        if not query:
+            return None
+        best = None
+        for key in self._candidates(query, threshold):
+            score = SequenceMatcher(None, query, key).ratio()
+            if score > threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
+
+
+class BM25Index:
+    """Inverted full-text index ranked with Okapi BM25"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[Any, int]] = defaultdict(dict)
+        self.doc_lengths: Dict[Any, int] = {}
+        self.total_length = 0
+        self._idf: Dict[str, float] = {}
+        self._norms: Dict[Any, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, doc_id: Any, text: str):
+        """Index a document; re-adding an ID is not supported
+
+        Not safe while other threads search: build a new index and swap it in instead.
+        """
+        tokens = tokenize(text)
+        for token, count in Counter(tokens).items():
+            self.postings[token][doc_id] = count
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+        # New dicts rather than clear(), so a search already holding the old ones can finish
+        self._idf = {}
+        self._norms = {}
+
+    def _term_idf(self, term: str) -> float:
+        idf = self._idf.get(term)
+        if idf is None:
+            frequency = len(self.postings.get(term, ()))
+            idf = math.log(1 + (len(self.doc_lengths) - frequency + 0.5) / (frequency + 0.5))
+            self._idf[term] = idf
+        return idf
+
+    def search(self, query: str, limit: int = 5, min_term_ratio: float = 0.0,
+               min_relative_score: float = 0.0) -> List[Tuple[Any, float]]:
+        """Top `limit` (doc_id, score) pairs for the query, best first
+
+        Documents must contain at least `min_term_ratio` of the query terms,
+        counting terms that occur nowhere in the index, and score at least
+        `min_relative_score` of the best score the indexed query terms could
+        give. Both are ratios, so they hold as the corpus grows.
+        """
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        terms = [term for term in query_terms if term in self.postings]
+        if not terms or not self.doc_lengths:
+            return []
+
+        if not self._norms:
+            # Length normalisation depends only on the corpus, so compute it once per build
+            average_length = self.total_length / len(self.doc_lengths)
+            self._norms = {doc_id: self.k1 * (1 - self.b + self.b * length / average_length)
+                           for doc_id, length in self.doc_lengths.items()}
+
+        norms = self._norms
+        scores: Dict[Any, float] = defaultdict(float)
+        matched_terms: Counter = Counter()
+        best_possible = 0.0
+        for term in terms:
+            # A term's contribution approaches idf * (k1 + 1) as its frequency grows
+            weight = self._term_idf(term) * (self.k1 + 1)
+            best_possible += weight
+            for doc_id, frequency in self.postings[term].items():
+                scores[doc_id] += weight * frequency / (frequency + norms[doc_id])
+                matched_terms[doc_id] += 1
+
+        required = math.ceil(min_term_ratio * len(query_terms))
+        min_score = min_relative_score * best_possible
+        eligible = ((doc_id, score) for doc_id, score in scores.items()
+                    if matched_terms[doc_id] >= required and score >= min_score)
+        return heapq.nlargest(limit, eligible, key=lambda item: item[1])
+
+
+class PrefixIndex:
+    """Sorted completion keys answering typeahead prefix queries with bisect
+
+    Each phrase is indexed under its full key and under every later word
+    start, so "makh" completes "murgh makhani". Lower `rank` sorts first.
+    Prefixes matching more than `dense_range` keys keep their best
+    `precomputed` completions per kind ready, so short prefixes stay fast.
+    """
+
+    def __init__(self, dense_range: int = 256, precomputed: int = 20):
+        self.dense_range = dense_range
+        self.precomputed = precomputed
+        self.keys: List[str] = []
+        self.entries: List[Tuple[Tuple[int, int, int, str], str, str]] = []
+        self.kinds: Set[str] = set()
+        self._pending: List[Tuple[str, Tuple[int, int, int, str], str, str]] = []
+        self._dense: Dict[str, Dict[str, List[Tuple[Tuple[int, int, int, str], str, str]]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys) + len(self._pending)
+
+    def add(self, text: str, kind: str, rank: int = 0):
+        key = normalize_key(text)
+        if not key:
+            return
+        words = key.split(' ')
+        for position in range(len(words)):
+            suffix = ' '.join(words[position:])
+            # Whole-phrase matches outrank matches on a later word
+            self._pending.append((suffix, (min(position, 1), rank, len(key), key), text, kind))
+        self.kinds.add(kind)
+
+    @staticmethod
+    def _best_unique(entries: Iterable[Tuple[Tuple[int, int, int, str], str, str]], limit: int,
+                     ordered: bool = False) -> List[Tuple[Tuple[int, int, int, str], str, str]]:
+        """First `limit` entries in rank order, skipping repeats of the same phrase"""
+        if not ordered:
+            # Heapify is linear, so large ranges only pay log n per result
+            heap = list(entries)
+            heapq.heapify(heap)
+            entries = (heapq.heappop(heap) for _ in range(len(heap)))
+        best, seen = [], set()
+        for entry in entries:
+            if entry[0][3] not in seen:
+                seen.add(entry[0][3])
+                best.append(entry)
+                if len(best) == limit:
+                    break
+        return best
+
+    def build(self):
+        """Sort pending phrases into the index now instead of on the next query"""
+        self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        merged = sorted(list(zip(self.keys, self.entries)) +
+                        [(key, (order, text, kind)) for key, order, text, kind in self._pending])
+        self.keys = [key for key, _ in merged]
+        self.entries = [entry for _, entry in merged]
+        self._pending = []
+        self._index_dense_prefixes()
+
+    def _index_dense_prefixes(self):
+        """Precompute completions for every prefix whose key range exceeds dense_range"""
+        self._dense = {}
+        ranges = [(0, len(self.keys), 0)]
+        while ranges:
+            start, end, depth = ranges.pop()
+            position = start
+            while position < end:
+                key = self.keys[position]
+                if len(key) <= depth:
+                    position += 1
+                    continue
+                prefix = key[:depth + 1]
+                stop = bisect.bisect_right(self.keys, prefix + '\uffff', position, end)
+                if stop - position > self.dense_range:
+                    by_kind = defaultdict(list)
+                    for entry in self.entries[position:stop]:
+                        by_kind[entry[2]].append(entry)
+                    self._dense[prefix] = {kind: self._best_unique(entries, self.precomputed)
+                                           for kind, entries in by_kind.items()}
+                    # Longer prefixes inside a dense range may still be dense
+                    ranges.append((position, stop, depth + 1))
+                position = stop
+
+    def complete(self, prefix: str, limit: int = 8, kinds: Optional[Iterable[str]] = None) -> List[Tuple[str, str]]:
+        """Best `limit` (text, kind) completions for the prefix, deduplicated by phrase"""
+        prefix = normalize_key(prefix)
+        if not prefix or limit <= 0:
+            return []
+        self._flush()
+        kinds = set(kinds) if kinds else self.kinds
+
+        dense = self._dense.get(prefix)
+        if dense is not None and limit <= self.precomputed:
+            ready = [dense.get(kind, []) for kind in kinds]
+            best = self._best_unique(heapq.merge(*ready), limit, ordered=True)
+        else:
+            start = bisect.bisect_left(self.keys, prefix)
+            # Every key starting with the prefix sorts before prefix + U+FFFF
+            end = bisect.bisect_right(self.keys, prefix + '\uffff', start)
+            best = self._best_unique((entry for entry in self.entries[start:end] if entry[2] in kinds), limit)
+        return [(text, kind) for _, text, kind in best]
+
+
+class RangeIndex:
+    """Recipe IDs sorted by a numeric field, answering inclusive range queries with bisect"""
+
+    def __init__(self, items: Iterable[Tuple[float, str]] = ()):
+        pairs = sorted(items)
+        self.values: List[float] = [value for value, _ in pairs]
+        self.ids: List[str] = [recipe_id for _, recipe_id in pairs]
+        self.value_of: Dict[str, float] = {recipe_id: value for value, recipe_id in pairs}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def add(self, value: float, recipe_id: str):
+        position = bisect.bisect_right(self.values, value)
+        self.values.insert(position, value)
+        self.ids.insert(position, recipe_id)
+        self.value_of[recipe_id] = value
+
+    def _bounds(self, low: Optional[float], high: Optional[float]) -> Tuple[int, int]:
+        start = 0 if low is None else bisect.bisect_left(self.values, low)
+        end = len(self.values) if high is None else bisect.bisect_right(self.values, high)
+        return start, max(start, end)
+
+    def count(self, low: Optional[float] = None, high: Optional[float] = None) -> int:
+        """Number of recipes with low <= value <= high, in O(log n)"""
+        start, end = self._bounds(low, high)
+        return end - start
+
+    def between(self, low: Optional[float] = None, high: Optional[float] = None) -> List[str]:
+        """Recipe IDs with low <= value <= high, in ascending value order"""
+        start, end = self._bounds(low, high)
+        return self.ids[start:end]
+
+    def contains(self, recipe_id: str, low: Optional[float] = None, high: Optional[float] = None) -> bool:
+        value = self.value_of.get(recipe_id)
+        if value is None:
+            return False
+        return (low is None or value >= low) and (high is None or value <= high)
+
+
+class PantryIndex:
+    """Recipe ingredient sets for "cook from what I have" queries
+
+    Recipes are filtered by counting pantry hits per recipe over the
+    ingredient postings (a recipe is makeable when hits == size); each
+    recipe's ingredient set is also an integer bitmask, so what a surviving
+    recipe still needs is a single AND against the pantry's complement.
+    """
+
+    def __init__(self, recipe_ids: List[str], ingredient_index: Dict[str, Set[str]]):
+        self.recipe_ids = list(recipe_ids)
+        self.rows = {recipe_id: row for row, recipe_id in enumerate(self.recipe_ids)}
+        self.postings = {
+            name: np.array(sorted(self.rows[recipe_id] for recipe_id in recipe_ids if recipe_id in self.rows),
+                           dtype=np.int64)
+            for name, recipe_ids in ingredient_index.items()
+        }
+        # Common ingredients take the low bits so most masks stay small integers
+        self.ingredients = sorted(self.postings, key=lambda name: (-len(self.postings[name]), name))
+        self.bits = {name: 1 << column for column, name in enumerate(self.ingredients)}
+
+        self.masks = [0] * len(self.recipe_ids)
+        for name, rows in self.postings.items():
+            for row in rows.tolist():
+                self.masks[row] |= self.bits[name]
+        self.sizes = np.array([mask.bit_count() for mask in self.masks], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.recipe_ids)
+
+    def mask_of(self, ingredients: Iterable[str]) -> int:
+        """Bitmask of the known ingredients among the given normalized names"""
+        mask = 0
+        for name in ingredients:
+            mask |= self.bits.get(name, 0)
+        return mask
+
+    def names_of(self, mask: int) -> List[str]:
+        """Ingredient names whose bits are set in mask, alphabetically"""
+        return sorted(self.ingredients[column] for column in range(mask.bit_length()) if mask >> column & 1)
+
+    def search(self, ingredients: Iterable[str], max_missing: int = 0) -> List[Tuple[str, int]]:
+        """(recipe_id, missing_mask) for recipes needing at most max_missing more ingredients
+
+        Ranked by fewest missing, then most pantry items used, then catalog order.
+        """
+        pantry = {name for name in ingredients if name in self.postings}
+        if pantry:
+            used = np.bincount(np.concatenate([self.postings[name] for name in pantry]),
+                               minlength=len(self.recipe_ids))
+        else:
+            used = np.zeros(len(self.recipe_ids), dtype=np.int64)
+        missing_counts = self.sizes - used
+        rows = np.flatnonzero(missing_counts <= max_missing)
+        rows = rows[np.lexsort((rows, -used[rows], missing_counts[rows]))]
+
+        absent = ~self.mask_of(pantry)
+        return [(self.recipe_ids[row], self.masks[row] & absent) for row in rows.tolist()]
+
+
+class RecipeMatrix:
+    """Recipe x ingredient incidence (CSR) plus per-recipe cuisine and difficulty arrays
+
+    Row i describes recipe_ids[i]. Query-side scores are computed once per
+    vocabulary entry and then broadcast over every recipe with array ops.
+    """
+
+    def __init__(self, recipe_ids: List[str], ingredient_index: Dict[str, Set[str]],
+                 cuisine_index: Dict[str, Set[str]], difficulty_weights: Dict[str, float]):
+        self.recipe_ids = list(recipe_ids)
+        self.rows = rows = {recipe_id: row for row, recipe_id in enumerate(self.recipe_ids)}
+
+        self.ingredients = sorted(ingredient_index)
+        self.ingredient_columns = {name: column for column, name in enumerate(self.ingredients)}
+        pairs = sorted(
+            (rows[recipe_id], column)
+            for column, name in enumerate(self.ingredients)
+            for recipe_id in ingredient_index[name] if recipe_id in rows
+        )
+        self.indices = np.array([column for _, column in pairs], dtype=np.int64)
+        row_lengths = np.bincount(np.array([row for row, _ in pairs], dtype=np.int64), minlength=len(rows))
+        self.indptr = np.concatenate(([0], np.cumsum(row_lengths)))
+        self.empty_rows = row_lengths == 0
+
+        self.cuisines = sorted(cuisine_index)
+        self.cuisine_columns = {cuisine: code for code, cuisine in enumerate(self.cuisines)}
+        self.cuisine_codes = np.zeros(len(rows), dtype=np.int64)
+        for code, cuisine in enumerate(self.cuisines):
+            for recipe_id in cuisine_index[cuisine]:
+                if recipe_id in rows:
+                    self.cuisine_codes[rows[recipe_id]] = code
+
+        self.difficulty_weights = np.array([difficulty_weights.get(recipe_id, 1.0) for recipe_id in self.recipe_ids])
+
+    def __len__(self) -> int:
+        return len(self.recipe_ids)
+
+    def best_ingredient_scores(self, ingredient_scores: Dict[str, float]) -> np.ndarray:
+        """Per recipe, the highest score among its ingredients (0 when none are scored)"""
+        column_scores = np.zeros(len(self.ingredients) + 1)
+        for name, score in ingredient_scores.items():
+            column_scores[self.ingredient_columns[name]] = score
+        # The trailing zero keeps reduceat in range when the last rows are empty
+        values = np.append(column_scores[self.indices], 0.0)
+        best = np.maximum.reduceat(values, self.indptr[:-1])
+        best[self.empty_rows] = 0.0
+        return best
+
+    def cuisine_mask(self, cuisine_scores: Dict[str, float], threshold: float) -> np.ndarray:
+        """Boolean mask of recipes whose cuisine scores above threshold"""
+        matched = np.zeros(len(self.cuisines), dtype=bool)
+        for cuisine, score in cuisine_scores.items():
+            matched[self.cuisine_columns[cuisine]] = score > threshold
+        return matched[self.cuisine_codes]
@@ -3,6 +3,8 @@ let ingredients = [];
 let recognition;
 let speechSynthesis = window.speechSynthesis;
 let currentlySpeaking = false;
+let autocompleteTimers = {};
+let recipeStream = null;
 
 // Check if browser supports speech recognition
 if ('webkitSpeechRecognition' in window) {
@@ -44,6 +46,14 @@ $(document).ready(function() {
         }
     });
 
+    // Typeahead completions while typing
+    $('#recipeSearch').on('input', function() {
+        autocompleteInput('#recipeSearch', '#recipeCompletions', 'recipe,alias');
+    });
+    $('#ingredientInput').on('input', function() {
+        autocompleteInput('#ingredientInput', '#ingredientCompletions', 'ingredient');
+    });
+
     // Find recipes button
     $('#findRecipes').click(function() {
         findRecipesByIngredients();
@@ -55,6 +65,30 @@ $(document).ready(function() {
     });
 });
 
+// Fill a datalist with completions, debounced so fast typing sends one request
+function autocompleteInput(inputSelector, listSelector, types) {
+    clearTimeout(autocompleteTimers[inputSelector]);
+    autocompleteTimers[inputSelector] = setTimeout(function() {
+        const prefix = $(inputSelector).val().trim();
+        if (prefix.length < 2) {
+            $(listSelector).empty();
+            return;
+        }
+
+        $.get('/api/autocomplete', { q: prefix, limit: 8, types: types })
+            .done(function(response) {
+                // Ignore responses for text the user has already changed
+                if (!response.success || $(inputSelector).val().trim() !== prefix) {
+                    return;
+                }
+                $(listSelector).empty();
+                response.suggestions.forEach(suggestion => {
+                    $(listSelector).append($('<option>').attr('value', suggestion.text));
+                });
+            });
+    }, 150);
+}
+
 // Add ingredient function
 function addIngredient() {
     const ingredient = $('#ingredientInput').val().trim();
@@ -82,6 +116,12 @@ function searchRecipe() {
     const query = $('#recipeSearch').val().trim();
     if (!query) return;
 
+    // Stream generated recipes piece by piece where the browser supports it
+    if (window.EventSource) {
+        streamRecipe(query);
+        return;
+    }
+
     showLoading('#recipeDisplay');
     
     $.ajax({
@@ -109,6 +149,69 @@ function searchRecipe() {
     });
 }
 
+// Search recipe over Server-Sent Events, showing each piece as it arrives
+function streamRecipe(query) {
+    if (recipeStream) {
+        recipeStream.close();
+    }
+    showLoading('#recipeDisplay');
+
+    const params = $.param({ query: query, ingredients: ingredients.join(',') });
+    const stream = recipeStream = new EventSource(`/api/stream_recipe?${params}`);
+
+    // Build the recipe skeleton on the first piece, replacing the spinner
+    function partialRecipe() {
+        if (!$('#recipeDisplay .recipe-details.streaming').length) {
+            $('#recipeDisplay').html(`
+                <div class="recipe-details streaming">
+                    <h3></h3>
+                    <h4>Ingredients</h4>
+                    <ul class="ingredients-list"></ul>
+                    <h4>Instructions</h4>
+                    <ol class="steps-list"></ol>
+                    <div class="loading"><i class="fas fa-spinner"></i></div>
+                </div>
+            `);
+        }
+        return $('#recipeDisplay .recipe-details.streaming');
+    }
+
+    stream.addEventListener('name', function(event) {
+        partialRecipe().find('h3').text(JSON.parse(event.data));
+    });
+    stream.addEventListener('ingredient', function(event) {
+        partialRecipe().find('.ingredients-list').append($('<li>').text(formatIngredient(JSON.parse(event.data))));
+    });
+    stream.addEventListener('step', function(event) {
+        partialRecipe().find('.steps-list').append($('<li>').text(formatStep(JSON.parse(event.data))));
+    });
+    stream.addEventListener('recipe', function(event) {
+        displayRecipe(JSON.parse(event.data).recipe);
+    });
+    stream.addEventListener('suggestions', function(event) {
+        $('#recipeDisplay').empty();
+        displaySuggestions(JSON.parse(event.data));
+    });
+    stream.addEventListener('done', function() {
+        stream.close();
+    });
+    stream.addEventListener('error', function(event) {
+        // Either a server-sent error event or a dropped connection
+        stream.close();
+        showError(event.data ? JSON.parse(event.data).error : 'Error searching for recipe');
+    });
+}
+
+// Generated recipes may list ingredients and steps as plain strings
+function formatIngredient(ing) {
+    if (typeof ing === 'string') return ing;
+    return [ing.quantity, ing.unit, ing.name].filter(part => part).join(' ');
+}
+
+function formatStep(step) {
+    return typeof step === 'string' ? step : step.step;
+}
+
 // Find recipes by ingredients
 function findRecipesByIngredients() {
     if (ingredients.length === 0) {
@@ -124,7 +227,8 @@ function findRecipesByIngredients() {
         contentType: 'application/json',
         data: JSON.stringify({
             ingredients: ingredients,
-            cuisine: $('#cuisineFilter').val()
+            cuisine: $('#cuisineFilter').val(),
+            max_time: $('#quickMeals').is(':checked') ? 30 : null
         }),
         success: function(response) {
             if (response.success && response.suggestions) {
@@ -158,14 +262,14 @@ function displayRecipe(recipe) {
             <h4>Ingredients</h4>
             <ul class="ingredients-list">
                 ${recipe.ingredients.map(ing => 
-                    `<li>${ing.quantity} ${ing.unit} ${ing.name}</li>`
+                    `<li>${formatIngredient(ing)}</li>`
                 ).join('')}
             </ul>
 
             <h4>Instructions</h4>
             <ol class="steps-list">
                 ${recipe.steps.map(step => 
-                    `<li>${step.step}</li>`
+                    `<li>${formatStep(step)}</li>`
                 ).join('')}
             </ol>
         </div>
@@ -0,0 +1,179 @@
+"""
+Streaming recipe generation: an incremental parser that turns the model's
+JSON output into recipe pieces as soon as each one is complete, and the
+Server-Sent Events framing used to push them to the browser, plus a
+broadcast that lets concurrent requests for one dish share a single stream.
+"""
+
+import json
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Array fields whose elements are pushed one by one, and the event each element becomes
+LIST_EVENTS = {"ingredients": "ingredient", "steps": "step"}
+
+
+def sse_event(event: str, data: Any) -> str:
+    """One Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class RecipeStreamParser:
+    """Incremental parser for a recipe JSON object arriving in text chunks
+
+    Each chunk is scanned once, tracking only nesting depth and string state.
+    A top-level field is decoded when the comma or brace after it arrives,
+    and each element of the ingredients and steps arrays as soon as it
+    closes, so the browser sees the name and the first ingredient long before
+    the model finishes. Text around the object, such as a markdown fence, is
+    skipped.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.start = None
+        self.end = None
+        self.key = None
+        self.key_start = None
+        self.value_start = None
+        self.item_start = None
+        self.list_event = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Add a chunk; return the (event, data) pairs it completed
+
+        Events are ("name", name), ("ingredient", item), ("step", item) and
+        ("field", {"key": ..., "value": ...}) for the remaining top-level fields.
+        """
+        self.text += chunk
+        text = self.text
+        events = []
+        for i in range(self.pos, len(text)):
+            if self.end is not None:
+                break
+            c = text[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif c == '\\':
+                    self.escaped = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.key_start is not None:
+                        self.key = self._decode(text[self.key_start:i + 1])
+                        self.key_start = None
+            elif self.depth == 0:
+                # Outside the object only its opening brace matters
+                if c == '{':
+                    self.start = i
+                    self.depth = 1
+            elif c == '"':
+                self.in_string = True
+                if self.depth == 1 and self.value_start is None:
+                    self.key_start = i
+            elif c in '{[':
+                if (self.depth == 1 and c == '[' and self.key in LIST_EVENTS
+                        and not text[self.value_start:i].strip()):
+                    self.list_event = LIST_EVENTS[self.key]
+                    self.item_start = i + 1
+                self.depth += 1
+            elif c in '}]':
+                if self.depth == 2 and self.list_event:
+                    self._end_item(text, i, events)
+                    self.list_event = None
+                self.depth -= 1
+                if self.depth == 0:
+                    self._end_value(text, i, events)
+                    self.end = i
+            elif c == ':' and self.depth == 1:
+                self.value_start = i + 1
+            elif c == ',':
+                if self.depth == 1:
+                    self._end_value(text, i, events)
+                elif self.depth == 2 and self.list_event:
+                    self._end_item(text, i, events)
+        self.pos = len(text)
+        return events
+
+    @staticmethod
+    def _decode(segment: str) -> Any:
+        try:
+            return json.loads(segment)
+        except json.JSONDecodeError:
+            return None
+
+    def _end_item(self, text: str, i: int, events: List[Tuple[str, Any]]):
+        segment = text[self.item_start:i].strip()
+        self.item_start = i + 1
+        if segment:
+            item = self._decode(segment)
+            if item is not None:
+                events.append((self.list_event, item))
+
+    def _end_value(self, text: str, i: int, events: List[Tuple[str, Any]]):
+        if self.value_start is None:
+            return
+        key, segment = self.key, text[self.value_start:i]
+        self.key = self.value_start = None
+        if key in LIST_EVENTS:
+            # Its elements were already sent one by one
+            return
+        value = self._decode(segment)
+        if key == "name" and isinstance(value, str):
+            events.append(("name", value))
+        elif value is not None:
+            events.append(("field", {"key": key, "value": value}))
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """The complete recipe object, or None if the stream ended early or was not valid JSON"""
+        if self.end is None:
+            return None
+        recipe = self._decode(self.text[self.start:self.end + 1])
+        return recipe if isinstance(recipe, dict) else None
+
+
+class StreamBroadcast:
+    """The pieces of one streamed generation, replayed to every request following it
+
+    The request that started the stream publishes each piece as it arrives;
+    a follower first gets every piece published so far, then each new one,
+    so it ends up with the same recipe as the producer.
+    """
+
+    def __init__(self):
+        self.events: List[Tuple[str, Any]] = []
+        self.done = False
+        self.result = None
+        self.condition = threading.Condition()
+
+    def publish(self, event: Tuple[str, Any]):
+        with self.condition:
+            self.events.append(event)
+            self.condition.notify_all()
+
+    def finish(self, result: Optional[Dict[str, Any]]):
+        """End the stream with its parsed recipe, or None if it failed or was abandoned"""
+        with self.condition:
+            self.done = True
+            self.result = result
+            self.condition.notify_all()
+
+    def follow(self, deadline=None) -> Iterator[Tuple[str, Any]]:
+        """Yield the stream's pieces; returns its recipe, or None if the deadline passes first"""
+        position = 0
+        while True:
+            with self.condition:
+                while position == len(self.events) and not self.done:
+                    if deadline is not None and deadline.expired():
+                        return None
+                    self.condition.wait(None if deadline is None else deadline.remaining())
+                events = self.events[position:]
+                position = len(self.events)
+                done = self.done
+            yield from events
+            if done:
+                return self.result
@@ -0,0 +1,34 @@
+"""
+Hedged recipe fetches under concurrency, against the simulated manager from
+benchmark.py, and the shared deadline of API calls coalesced across
+requests. Run with `python -m pytest test_hedged_fetch.py`.
+"""
+
+from benchmark import run_hedged_fetch
+from openai_async import Deadline, SharedDeadline
+
+
+def test_every_answer_belongs_to_its_own_request():
+    found, leaks, _, _, _ = run_hedged_fetch(threads=16, request_count=200)
+    assert found > 0
+    assert leaks == 0, f"{leaks} results answered another request"
+
+
+def test_fetch_pool_threads_are_released():
+    _, _, _, _, threads_left = run_hedged_fetch(threads=8, request_count=50)
+    assert threads_left == 0
+
+
+def test_shared_deadline_outlives_one_caller_giving_up():
+    shared = SharedDeadline(5)
+    first, second = Deadline(5), Deadline(5)
+    shared.join(first)
+    shared.join(second)
+
+    first.cancel()
+    assert not shared.cancelled
+    assert not shared.expired()
+
+    second.cancel()
+    assert shared.cancelled
+    assert shared.expired()
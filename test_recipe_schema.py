@@ -0,0 +1,75 @@
+"""
+Repair and validation of generated recipes: model output that is fenced,
+truncated or slightly malformed still becomes a catalog-shaped recipe.
+"""
+
+import json
+
+import pytest
+
+from recipe_schema import (
+    DEFAULT_QUANTITY,
+    RecipeValidationError,
+    normalize_ingredient,
+    normalize_piece,
+    parse_recipe,
+    repair_json,
+    validate_recipe,
+)
+
+RECIPE = {
+    "name": "Jeera Rice",
+    "cuisine_type": "North Indian",
+    "preparation_time": 25,
+    "description": "Rice tempered with cumin",
+    "difficulty_level": "Easy",
+    "serving_size": 4,
+    "ingredients": [{"name": "basmati rice", "quantity": 1, "unit": "cup"},
+                    {"name": "cumin seeds", "quantity": 1, "unit": "teaspoon"}],
+    "steps": [{"step": "Temper the cumin in ghee", "time": 2}, {"step": "Cook the rice", "time": 20}]
+}
+
+
+def test_truncated_output_drops_the_unfinished_element():
+    text = json.dumps(RECIPE)
+    cut = text[:text.index("Cook the rice") + 4]
+    repaired = repair_json(cut)
+    assert repaired["ingredients"] == RECIPE["ingredients"]
+    assert repaired["steps"] == RECIPE["steps"][:1]
+
+
+def test_fenced_reply_is_unwrapped():
+    reply = f"Here is your recipe:\n```json\n{json.dumps(RECIPE, indent=2)}\n```\nEnjoy!"
+    assert repair_json(reply) == RECIPE
+    assert parse_recipe(reply) == RECIPE
+
+
+def test_trailing_commas_are_removed():
+    text = json.dumps(RECIPE).replace('"}]', '"},]').replace('}', ',}')
+    assert repair_json(text) == RECIPE
+
+
+def test_missing_steps_list_is_rejected():
+    recipe = {key: value for key, value in RECIPE.items() if key != "steps"}
+    with pytest.raises(RecipeValidationError):
+        validate_recipe(recipe)
+
+
+def test_quantities_are_always_numeric():
+    recipe = validate_recipe(dict(RECIPE, ingredients=["salt to taste", "2 cups rice", "oil",
+                                                       {"name": "chili", "quantity": "as needed"}]))
+    assert recipe["ingredients"] == [
+        {"name": "salt", "quantity": DEFAULT_QUANTITY, "unit": "to taste"},
+        {"name": "rice", "quantity": 2, "unit": "cups"},
+        {"name": "oil", "quantity": DEFAULT_QUANTITY, "unit": ""},
+        {"name": "chili", "quantity": DEFAULT_QUANTITY, "unit": "as needed"},
+    ]
+
+
+def test_streamed_pieces_match_the_final_recipe_shape():
+    assert normalize_piece("ingredient", "1/2 teaspoon of turmeric") == (
+        "ingredient", normalize_ingredient("1/2 teaspoon of turmeric"))
+    assert normalize_piece("step", {"instruction": "Stir", "duration": "5 minutes"}) == (
+        "step", {"step": "Stir", "time": 5})
+    assert normalize_piece("step", {}) is None
+    assert normalize_piece("name", "Jeera Rice") == ("name", "Jeera Rice")
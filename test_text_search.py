@@ -0,0 +1,26 @@
+"""
+Full-text recipe search: descriptive queries find a catalog recipe, dishes
+the catalog lacks find nothing and go to the API.
+"""
+
+import pytest
+
+from indian_recipes import search_recipes_by_text
+
+
+def _names(query):
+    return [recipe["name"] for recipe in search_recipes_by_text(query)]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("something with mustard gravy", "Bengali Fish Curry"),
+    ("crispy fried snack", "Chicken 65"),
+    ("creamy black lentils", "Dal Makhani"),
+])
+def test_descriptive_query_finds_catalog_recipe(query, expected):
+    assert _names(query)[:1] == [expected]
+
+
+@pytest.mark.parametrize("query", ["tomato soup", "rice pudding", "potato salad", "fish and chips"])
+def test_dish_missing_from_catalog_matches_nothing(query):
+    assert _names(query) == []
@@ -0,0 +1,144 @@
+"""
+Cache warm-up: replays popular queries after a deploy so the first users
+do not pay cold-cache latency on common dishes.
+
+Usage:
+    python warmup.py [--top N] [query ...]
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Voice queries are appended here so warm-up can replay the most popular ones;
+# set QUERY_LOG_PATH to an empty value to stop recording
+QUERY_LOG_PATH = os.getenv('QUERY_LOG_PATH', 'query_log.txt')
+# Comma-separated queries that are always warmed, ahead of the log
+WARMUP_QUERIES = [query.strip() for query in os.getenv('WARMUP_QUERIES', '').split(',') if query.strip()]
+WARMUP_TOP_N = int(os.getenv('WARMUP_TOP_N', 20))
+# The log is rotated to <path>.1 at this size, so it never holds more than twice as much
+QUERY_LOG_MAX_BYTES = int(os.getenv('QUERY_LOG_MAX_BYTES', 1024 * 1024))
+
+
+class QueryLog:
+    """Append-only log of user queries, one per line
+
+    Once the log reaches max_bytes it is moved to <path>.1, replacing the
+    previous one, and a new log is started; popularity is counted over both.
+    """
+
+    def __init__(self, path: str = QUERY_LOG_PATH, max_bytes: int = QUERY_LOG_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    @property
+    def rotated_path(self) -> str:
+        return self.path + '.1'
+
+    def record(self, query: str):
+        query = ' '.join(query.lower().split())
+        if not self.path or not query:
+            return
+        try:
+            with self.lock:
+                with open(self.path, 'a', encoding='utf-8') as log_file:
+                    log_file.write(query + '\n')
+                    full = self.max_bytes > 0 and log_file.tell() >= self.max_bytes
+                if full:
+                    os.replace(self.path, self.rotated_path)
+        except OSError as e:
+            logger.error(f"Failed to record query: {e}")
+
+    def top(self, limit: int) -> List[str]:
+        """The `limit` most frequent logged queries, most frequent first"""
+        if not self.path:
+            return []
+        counts = Counter()
+        try:
+            with self.lock:
+                for path in (self.rotated_path, self.path):
+                    if os.path.exists(path):
+                        with open(path, encoding='utf-8') as log_file:
+                            counts.update(line.strip() for line in log_file if line.strip())
+        except OSError as e:
+            logger.error(f"Failed to read query log: {e}")
+            return []
+        return [query for query, _ in counts.most_common(limit)]
+
+
+def popular_queries(limit: int = WARMUP_TOP_N, query_log: Optional[QueryLog] = None,
+                    configured: Iterable[str] = WARMUP_QUERIES) -> List[str]:
+    """Configured queries first, then the most frequent logged ones, without duplicates"""
+    queries = list(dict.fromkeys(' '.join(query.lower().split()) for query in configured))
+    if query_log is not None and len(queries) < limit:
+        queries += [query for query in query_log.top(limit) if query not in queries]
+    return queries[:limit]
+
+
+class CacheWarmer:
+    """Runs queries through a RecipeManager in a background thread and reports readiness"""
+
+    def __init__(self, recipe_manager: Any, queries: List[str]):
+        self.recipe_manager = recipe_manager
+        self.queries = list(queries)
+        self.ready = threading.Event()
+        self.completed = 0
+        self.found = 0
+        self.failed = 0
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+
+    def run(self):
+        """Warm every query in the calling thread"""
+        self.started_at = time.time()
+        try:
+            for query in self.queries:
+                try:
+                    if self.recipe_manager.warm_query(query):
+                        self.found += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Warm-up failed for '{query}': {e}")
+                self.completed += 1
+        finally:
+            self.finished_at = time.time()
+            self.ready.set()
+            logger.info(f"Cache warm-up finished: {self.found}/{len(self.queries)} queries found a recipe")
+
+    def start(self) -> "CacheWarmer":
+        """Warm in a daemon thread so serving traffic is not blocked"""
+        self._thread = threading.Thread(target=self.run, name="cache-warmer", daemon=True)
+        self._thread.start()
+        return self
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready.is_set(),
+            "total": len(self.queries),
+            "completed": self.completed,
+            "found": self.found,
+            "failed": self.failed,
+            "seconds": round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else None
+        }
+
+
+if __name__ == "__main__":
+    from main import RecipeManager
+
+    parser = argparse.ArgumentParser(description="Pre-fill the recipe caches with popular queries")
+    parser.add_argument("queries", nargs="*", help="queries to warm (default: configured list and query log)")
+    parser.add_argument("--top", type=int, default=WARMUP_TOP_N, help="number of logged queries to replay")
+    args = parser.parse_args()
+
+    manager = RecipeManager()
+    warmer = CacheWarmer(manager, args.queries or popular_queries(args.top, manager.query_log))
+    warmer.run()
+    print(warmer.status())